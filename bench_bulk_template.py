@@ -0,0 +1,60 @@
+from email.mime.text import MIMEText
+import base64
+import logging
+import random
+import time
+from bulk_template import BulkTemplate, template_values
+from reply_message import build_reply_message, new_message_id
+from sanitize import sanitize_text
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+RENDERS = 10000
+NAMES = ["Ali Khan", "Sara Ahmed", "Usman Tariq", "Ayesha Malik", "Bilal Raza", "Hina Shah", "Zain Ali", "Fatima Noor"]
+MESSAGE = (
+    "Dear {first_name},\n\n"
+    "Thank you for your email about \"{subject}\" sent on {original_date}. The fee voucher deadline has been "
+    "extended to the end of the month, and vouchers can now be paid online through the bank app. "
+    "If you have already paid, please ignore this message.\n\n"
+    "Best regards,\nRao Faizan Raza\nIT Instructor at Al-Khair Institute"
+)
+
+def synthetic_rows(seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(RENDERS):
+        name = rng.choice(NAMES)
+        sender = f"{name} <{name.split()[0].lower()}{i}@example.com>"
+        rows.append((sender, f"Question {i % 12}", f"2024-03-{i % 28 + 1:02d} 10:00:00"))
+    return rows
+
+# Old path: sanitize and build a MIMEText for every recipient
+def bench_per_recipient(rows):
+    started = time.perf_counter()
+    for sender, subject, email_date in rows:
+        body = sanitize_text(MESSAGE).format(**template_values(sender, subject, email_date))
+        message = MIMEText(body)
+        message["to"] = sender
+        message["subject"] = "Fee update"
+        {"raw": base64.urlsafe_b64encode(message.as_bytes()).decode()}
+    return time.perf_counter() - started
+
+# New path: compile once, then render text and MIME per recipient
+def bench_compiled(rows):
+    started = time.perf_counter()
+    template = BulkTemplate(MESSAGE)
+    thread = {"thread_id": "t1", "header_message_id": "<original@mail.gmail.com>"}
+    for sender, subject, email_date in rows:
+        body = template.render(template_values(sender, subject, email_date))
+        build_reply_message(sender, "Fee update", body, thread, message_id=new_message_id())
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    rows = synthetic_rows()
+    per_recipient = bench_per_recipient(rows)
+    compiled = bench_compiled(rows)
+    print(f"Renders:                {RENDERS}")
+    print(f"Sanitize + MIMEText:    {per_recipient:.2f}s ({per_recipient / RENDERS * 1e6:.0f} µs each)")
+    print(f"Compiled template:      {compiled:.2f}s ({compiled / RENDERS * 1e6:.0f} µs each)")
+    print(f"Speedup:                {per_recipient / compiled:.1f}x")
@@ -0,0 +1,73 @@
+import logging
+import random
+import time
+from dedupe import cluster_texts, similarity_text
+from prompt_builder import clean_body
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+EMAILS = 400
+TEMPLATES = 12
+UNIQUE_SHARE = 0.25
+NAMES = ["Ali", "Sara", "Usman", "Ayesha", "Bilal", "Hina", "Zain", "Fatima", "Omar", "Noor"]
+# One recurring question per template; the same wave of mail differs only in greeting, name and sign-off
+QUESTIONS = [
+    "When is the last date to submit the fee voucher for this semester, and can it be paid online through the bank app?",
+    "Have the class timings changed for the weekend batch? The portal still shows the old schedule from last month.",
+    "Can the assignment deadline for module three be extended by two days because of the power outage in our area?",
+    "How do I get my course completion certificate? I finished all modules but the download button is not working.",
+    "My lab access card stopped working yesterday. Who should I contact to get it reactivated before Monday?",
+    "Is the final exam going to be online or on campus, and will calculators be allowed in the paper?",
+    "Could you share the updated course outline with the new React and Next.js topics that were mentioned in class?",
+    "I was marked absent last Thursday although I attended the lecture. How can my attendance be corrected?",
+    "Can I switch to a different project group? My current group members have stopped responding to messages.",
+    "I missed the lecture on TypeScript generics due to illness. Will there be a makeup class or a recording?",
+    "What topics will the admission test cover, and is there any sample paper available for practice?",
+    "What is the process to apply for the need-based scholarship, and which documents are required?",
+]
+WORDS = ("please kindly soon today tomorrow question regarding issue update thanks help need confirm "
+         "portal email phone campus batch section teacher lecture notes slides quiz marks result").split()
+
+# A template email with greeting, name and sign-off varied per sender
+def template_email(rng, topic, name):
+    greeting = rng.choice(["Dear Sir", "Hello Sir", "Respected Sir", "Hi"])
+    extra = rng.choice(["", " Please reply soon.", " Thanks in advance.", " I am in batch 12."])
+    body = f"{greeting},\nThis is {name}. {QUESTIONS[topic]}{extra}\nRegards,\n{name}"
+    return f"Question {topic}", body
+
+def unique_email(rng):
+    return "Misc", " ".join(rng.choice(WORDS) for _ in range(60))
+
+def synthetic_corpus(seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(EMAILS):
+        if rng.random() < UNIQUE_SHARE:
+            corpus.append((i, None, *unique_email(rng)))
+        else:
+            topic = rng.randrange(TEMPLATES)
+            corpus.append((i, topic, *template_email(rng, topic, rng.choice(NAMES))))
+    return corpus
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    corpus = synthetic_corpus()
+    started = time.perf_counter()
+    items = [(i, similarity_text(subject, clean_body(body))) for i, _, subject, body in corpus]
+    clusters = cluster_texts(items)
+    elapsed = time.perf_counter() - started
+    # A reload of the bulk page reuses memoized signatures
+    started = time.perf_counter()
+    cluster_texts(items)
+    warm = time.perf_counter() - started
+
+    labels = {i: topic for i, topic, _, _ in corpus}
+    mixed = sum(1 for cluster in clusters if len({f"unique{i}" if labels[i] is None else labels[i] for i in cluster}) > 1)
+    ideal = TEMPLATES + sum(1 for _, topic, _, _ in corpus if topic is None)
+    print(f"Emails:                 {len(corpus)}")
+    print(f"LLM calls without dedupe: {len(corpus)}")
+    print(f"LLM calls with dedupe:    {len(clusters)} (ideal {ideal})")
+    print(f"Calls saved:            {len(corpus) - len(clusters)} ({(len(corpus) - len(clusters)) / len(corpus):.0%})")
+    print(f"Clusters mixing topics: {mixed}")
+    print(f"Clustering time:        {elapsed * 1000:.0f} ms cold, {warm * 1000:.0f} ms warm")
@@ -0,0 +1,52 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from reply_db import init_db, save_email_reply, EmailBatchWriter
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+ROWS = 10000
+PAGE_SIZE = 100
+
+def synthetic_rows(prefix):
+    for i in range(ROWS):
+        yield (
+            f"sender{i}@example.com", f"sender{i}@example.com", f"Subject {i}", "2024-01-01 10:00:00",
+            f"Reply {i}", "2024-01-01 10:05:00", "draft", f"<p>Body of synthetic message {i}</p>" * 20,
+            f"draft{i}", f"{prefix}{i}"
+        )
+
+# Current path: one connection and one commit per row
+def bench_per_row():
+    started = time.perf_counter()
+    for row in synthetic_rows("row"):
+        save_email_reply(*row)
+    return time.perf_counter() - started
+
+# Batched path: one executemany transaction per page
+def bench_batched():
+    conn = sqlite3.connect("replied_emails.db")
+    writer = EmailBatchWriter(conn)
+    started = time.perf_counter()
+    for i, row in enumerate(synthetic_rows("batch"), start=1):
+        writer.add(row)
+        if i % PAGE_SIZE == 0:
+            writer.flush()
+    writer.flush()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+if __name__ == "__main__":
+    # reply_db logs every save at INFO; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+    os.chdir(tempfile.mkdtemp())
+    init_db()
+    per_row = bench_per_row()
+    batched = bench_batched()
+    print(f"Per-row inserts:  {ROWS / per_row:>10,.0f} rows/s ({per_row:.2f}s)")
+    print(f"Batched inserts:  {ROWS / batched:>10,.0f} rows/s ({batched:.2f}s, {PAGE_SIZE} rows per transaction)")
+    print(f"Speedup:          {per_row / batched:>10.1f}x")
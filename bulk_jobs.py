@@ -0,0 +1,321 @@
+from datetime import datetime
+import logging
+import threading
+import uuid
+import db
+from send_rate import send_limiter, recipient_domain
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'cancelled', 'failed')
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def init_bulk_job_tables(db_path="replied_emails.db"):
+    conn = db.connect(db_path)
+    try:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS bulk_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                subject TEXT,
+                use_ai_reply INTEGER DEFAULT 0,
+                custom_prompt TEXT,
+                total INTEGER DEFAULT 0,
+                cancel_requested INTEGER DEFAULT 0,
+                last_error TEXT,
+                created_at DATETIME,
+                updated_at DATETIME
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS bulk_job_items (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                message_id TEXT,
+                sender TEXT,
+                email_subject TEXT,
+                email_date DATETIME,
+                draft_id TEXT,
+                outgoing_message_id TEXT,
+                reply TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                updated_at DATETIME,
+                PRIMARY KEY (job_id, position)
+            )
+        ''')
+        columns = [info[1] for info in conn.execute("PRAGMA table_info(bulk_job_items)")]
+        if 'outgoing_message_id' not in columns:
+            conn.execute('ALTER TABLE bulk_job_items ADD COLUMN outgoing_message_id TEXT')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_bulk_jobs_status ON bulk_jobs (status, created_at)')
+        conn.commit()
+    finally:
+        conn.close()
+
+# Store a new job and its items; items are dicts with message_id, sender, subject, email_date, draft_id
+# and optionally an already rendered reply. Other items get the shared message; AI jobs leave replies for the runner
+def create_bulk_job(items, subject, message=None, use_ai_reply=False, custom_prompt=None, db_path="replied_emails.db"):
+    job_id = uuid.uuid4().hex
+    now = _now()
+    conn = db.connect(db_path)
+    try:
+        with conn:
+            conn.execute('''
+                INSERT INTO bulk_jobs (job_id, status, subject, use_ai_reply, custom_prompt, total, created_at, updated_at)
+                VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)
+            ''', (job_id, subject, int(use_ai_reply), custom_prompt, len(items), now, now))
+            conn.executemany('''
+                INSERT INTO bulk_job_items (job_id, position, message_id, sender, email_subject, email_date, draft_id, reply, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?)
+            ''', [
+                (job_id, position, item['message_id'], item['sender'], item['subject'], item['email_date'],
+                 item.get('draft_id'), None if use_ai_reply else item.get('reply', message), now)
+                for position, item in enumerate(items)
+            ])
+    finally:
+        conn.close()
+    logger.info(f"🚀 Queued bulk job {job_id} with {len(items)} emails")
+    return job_id
+
+def _job_dict(row):
+    return dict(zip(['job_id', 'status', 'subject', 'use_ai_reply', 'custom_prompt', 'total', 'cancel_requested', 'last_error', 'created_at', 'updated_at'], row))
+
+ITEM_COLUMNS = ['position', 'message_id', 'sender', 'email_subject', 'email_date', 'draft_id', 'outgoing_message_id', 'reply', 'status', 'error']
+
+# Job with per-status counts, or None if unknown; include_items adds every item's state
+def get_bulk_job(job_id, include_items=False, db_path="replied_emails.db"):
+    conn = db.connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM bulk_jobs WHERE job_id=?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = _job_dict(row)
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM bulk_job_items WHERE job_id=? GROUP BY status", (job_id,)).fetchall())
+        job['counts'] = {status: counts.get(status, 0) for status in ('pending', 'sending', 'sent', 'failed', 'cancelled')}
+        if include_items:
+            job['items'] = [
+                {'position': r[0], 'message_id': r[1], 'sender': r[2], 'status': r[3], 'error': r[4]}
+                for r in conn.execute("SELECT position, message_id, sender, status, error FROM bulk_job_items WHERE job_id=? ORDER BY position", (job_id,))
+            ]
+        return job
+    finally:
+        conn.close()
+
+def list_bulk_jobs(limit=20, db_path="replied_emails.db"):
+    conn = db.connect(db_path)
+    try:
+        rows = conn.execute("SELECT job_id FROM bulk_jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [get_bulk_job(row[0], db_path=db_path) for row in rows]
+
+# Ask a job to stop; items not yet sent are cancelled by the runner. Returns False for unknown or finished jobs
+def cancel_bulk_job(job_id, db_path="replied_emails.db"):
+    conn = db.connect(db_path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE bulk_jobs SET cancel_requested=1, updated_at=? WHERE job_id=? AND status NOT IN ({','.join('?' * len(FINISHED_STATUSES))})",
+                (_now(), job_id, *FINISHED_STATUSES)
+            )
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+# Runs queued bulk jobs one at a time on a background thread, pacing sends with the shared send budgets
+# and resuming after a restart
+# prepare_fn(job, items) -> {position: reply} for items without a reply yet
+# stage_fn(job, item) -> item fields (draft_id, outgoing_message_id) saved before the send; deliver_fn(job, item) sends and raises on failure
+# was_delivered_fn(item) tells whether an item interrupted mid-send actually went out, recording it if so
+class BulkSendScheduler:
+    def __init__(self, prepare_fn, stage_fn, deliver_fn, was_delivered_fn, db_path="replied_emails.db", limiter=None):
+        self.prepare_fn = prepare_fn
+        self.stage_fn = stage_fn
+        self.deliver_fn = deliver_fn
+        self.was_delivered_fn = was_delivered_fn
+        self.db_path = db_path
+        self.limiter = limiter or send_limiter
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        init_bulk_job_tables(self.db_path)
+        self.recover()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="bulk-send", daemon=True)
+        self._thread.start()
+        logger.info("🚀 Bulk send scheduler started")
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    # New job queued or cancel requested; don't wait for the next poll
+    def wake(self):
+        self._wake.set()
+
+    def _connect(self):
+        return db.connect(self.db_path)
+
+    # Items left in 'sending' by a crash are settled before anything else runs, so nothing is sent twice
+    def recover(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT job_id, {', '.join(ITEM_COLUMNS)} FROM bulk_job_items WHERE status='sending'").fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            job_id, item = row[0], dict(zip(ITEM_COLUMNS, row[1:]))
+            try:
+                delivered = self.was_delivered_fn(item)
+            except Exception as e:
+                logger.error(f"⚠️ Could not confirm delivery for {item['message_id']}, not resending: {e}")
+                delivered = True
+            if delivered:
+                self._set_item(job_id, item['position'], 'sent')
+            else:
+                self._set_item(job_id, item['position'], 'pending')
+            logger.info(f"🔁 Recovered bulk item {item['message_id']} as {'sent' if delivered else 'pending'}")
+
+    def _set_item(self, job_id, position, status, error=None, **fields):
+        assignments = ''.join(f", {column}=?" for column in fields)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    f"UPDATE bulk_job_items SET status=?, error=?, updated_at=?{assignments} WHERE job_id=? AND position=?",
+                    (status, error, _now(), *fields.values(), job_id, position)
+                )
+        finally:
+            conn.close()
+
+    def _set_job(self, job_id, status, last_error=None):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("UPDATE bulk_jobs SET status=?, last_error=COALESCE(?, last_error), updated_at=? WHERE job_id=?", (status, last_error, _now(), job_id))
+        finally:
+            conn.close()
+
+    def _next_job(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM bulk_jobs WHERE status IN ('queued', 'running') ORDER BY created_at LIMIT 1").fetchone()
+            return _job_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def _pending_items(self, job_id):
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT {', '.join(ITEM_COLUMNS)} FROM bulk_job_items WHERE job_id=? AND status='pending' ORDER BY position", (job_id,)).fetchall()
+            return [dict(zip(ITEM_COLUMNS, row)) for row in rows]
+        finally:
+            conn.close()
+
+    def _cancel_requested(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT cancel_requested FROM bulk_jobs WHERE job_id=?", (job_id,)).fetchone()
+            return bool(row and row[0])
+        finally:
+            conn.close()
+
+    # Wait for a send slot to the item's domain; False if the job was cancelled or the scheduler is stopping
+    def _pace(self, job_id, item):
+        domain = recipient_domain(item['sender'])
+        while not self._stopping.is_set():
+            if self._cancel_requested(job_id):
+                return False
+            wait = self.limiter.reserve(domain)
+            if wait <= 0:
+                return True
+            self._wake.wait(wait)
+            self._wake.clear()
+        return False
+
+    # Projected finish time (epoch seconds) of a job's remaining sends, counting the jobs queued ahead of it;
+    # None if it has nothing left to send
+    def projected_completion(self, job_id):
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT i.job_id, i.sender FROM bulk_job_items i JOIN bulk_jobs j ON j.job_id = i.job_id
+                WHERE i.status='pending' AND j.status IN ('queued', 'running') AND j.cancel_requested=0
+                  AND j.rowid <= (SELECT rowid FROM bulk_jobs WHERE job_id=?)
+                ORDER BY j.rowid, i.position
+            ''', (job_id,)).fetchall()
+        finally:
+            conn.close()
+        if not any(row[0] == job_id for row in rows):
+            return None
+        return self.limiter.project([recipient_domain(sender) for _, sender in rows])
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            job = None
+            try:
+                job = self._next_job()
+                if job:
+                    self.run_job(job)
+                    continue
+            except Exception as e:
+                logger.error(f"⚠️ Bulk job {job['job_id'] if job else ''} crashed: {e}")
+                if job:
+                    self._set_job(job['job_id'], 'failed', str(e))
+            self._wake.wait(timeout=5)
+            self._wake.clear()
+
+    def run_job(self, job):
+        job_id = job['job_id']
+        self._set_job(job_id, 'running')
+
+        # Replies are generated and stored before any send, so a restart never regenerates what was saved
+        unprepared = [item for item in self._pending_items(job_id) if not item['reply']]
+        if unprepared and not self._cancel_requested(job_id):
+            replies = self.prepare_fn(job, unprepared)
+            for item in unprepared:
+                reply = replies.get(item['position'])
+                if reply:
+                    self._set_item(job_id, item['position'], 'pending', reply=reply)
+                else:
+                    self._set_item(job_id, item['position'], 'failed', "No reply generated")
+
+        for item in self._pending_items(job_id):
+            if not self._pace(job_id, item):
+                break
+            try:
+                staged = self.stage_fn(job, item)
+                item.update(staged)
+                # Marked before the send so a crash mid-send is settled by recover() instead of resent
+                self._set_item(job_id, item['position'], 'sending', **staged)
+                self.deliver_fn(job, item)
+                self._set_item(job_id, item['position'], 'sent')
+                logger.info(f"✅ Bulk job {job_id}: sent {item['position'] + 1}/{job['total']} to {item['sender']}")
+            except Exception as e:
+                logger.error(f"⚠️ Bulk job {job_id}: failed for {item['sender']}: {e}")
+                self._set_item(job_id, item['position'], 'failed', str(e))
+
+        # On shutdown the job stays running and picks up where it left off after the restart
+        if self._stopping.is_set():
+            return
+        if self._cancel_requested(job_id):
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("UPDATE bulk_job_items SET status='cancelled', updated_at=? WHERE job_id=? AND status='pending'", (_now(), job_id))
+            finally:
+                conn.close()
+            self._set_job(job_id, 'cancelled')
+            logger.info(f"🛑 Bulk job {job_id} cancelled")
+        else:
+            self._set_job(job_id, 'completed')
+            logger.info(f"🏁 Bulk job {job_id} completed")
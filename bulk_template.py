@@ -0,0 +1,69 @@
+from datetime import datetime
+from email.utils import parseaddr
+from string import Formatter
+import logging
+import re
+from dedupe import sender_first_name
+from sanitize import sanitize_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Placeholders a bulk message may use, filled from each recipient's replied_emails row
+TEMPLATE_FIELDS = ('first_name', 'name', 'email', 'subject', 'original_date')
+
+# The common "Name <address>" and bare-address forms; anything else goes through parseaddr
+SIMPLE_ADDRESS_RE = re.compile(r'^\s*"?([^"<>@]*?)"?\s*<([^<>\s]+@[^<>\s]+)>\s*$|^\s*([^<>\s"]+@[^<>\s"]+)\s*$')
+
+class TemplateError(ValueError):
+    pass
+
+# A bulk message sanitized and parsed once, then rendered per recipient by joining precomputed parts
+# Placeholders use str.format syntax: {first_name}; literal braces are written {{ and }}
+class BulkTemplate:
+    def __init__(self, text):
+        self.text = sanitize_text(text)
+        self._parts = []
+        try:
+            for literal, field, spec, conversion in Formatter().parse(self.text):
+                if field is not None and field not in TEMPLATE_FIELDS:
+                    raise TemplateError(f"Unknown placeholder {{{field}}}; use one of " + ", ".join(f"{{{name}}}" for name in TEMPLATE_FIELDS))
+                if spec or conversion:
+                    raise TemplateError(f"Placeholder {{{field}}} can't take a format spec or conversion")
+                self._parts.append((literal, field))
+        except TemplateError:
+            raise
+        except ValueError as e:
+            raise TemplateError(f"Invalid template ({e}); write literal braces as {{{{ and }}}}")
+        self.fields = {field for _, field in self._parts if field}
+        # Without placeholders every recipient gets the same text
+        self._static = None if self.fields else ''.join(literal for literal, _ in self._parts)
+
+    def render(self, values):
+        if self._static is not None:
+            return self._static
+        return ''.join(literal + values[field] if field else literal for literal, field in self._parts)
+
+def split_address(sender):
+    match = SIMPLE_ADDRESS_RE.match(sender or '')
+    if match:
+        return (match.group(1) or '', match.group(2) or match.group(3))
+    return parseaddr(sender or '')
+
+# Placeholder values for one recipient
+def template_values(sender, subject, email_date):
+    name, address = split_address(sender)
+    original_date = email_date or ''
+    for date_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            original_date = datetime.strptime(email_date, date_format).strftime("%d %B %Y")
+            break
+        except (TypeError, ValueError):
+            continue
+    return {
+        'first_name': sender_first_name(sender) or 'there',
+        'name': name or sender_first_name(sender) or address,
+        'email': address,
+        'subject': subject or 'No Subject',
+        'original_date': original_date
+    }
@@ -11,4 +11,44 @@ class Config:
     SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
     BULK_EMAIL_LIMIT_MIN = int(os.getenv("BULK_EMAIL_LIMIT_MIN", 2))
     BULK_EMAIL_LIMIT_MAX = int(os.getenv("BULK_EMAIL_LIMIT_MAX", 400))
-    SCOPES = ['https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.send']
\ No newline at end of file
+    SCOPES = ['https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.send']
+
+    GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", 50))
+    FETCH_PAGE_SIZE = int(os.getenv("FETCH_PAGE_SIZE", 100))
+    FETCH_MAX_MESSAGES = int(os.getenv("FETCH_MAX_MESSAGES", 0))
+    FETCH_TIME_BUDGET = float(os.getenv("FETCH_TIME_BUDGET", 0))
+    GMAIL_MAILBOX = os.getenv("GMAIL_MAILBOX", "me")
+    FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 2))
+    GMAIL_TOKEN_REFRESH_MARGIN = int(os.getenv("GMAIL_TOKEN_REFRESH_MARGIN", 300))
+    GMAIL_HTTP_TIMEOUT = int(os.getenv("GMAIL_HTTP_TIMEOUT", 60))
+    MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", 512 * 1024))
+    GMAIL_QUOTA_UNITS_PER_SECOND = int(os.getenv("GMAIL_QUOTA_UNITS_PER_SECOND", 250))
+    GMAIL_MAX_RETRIES = int(os.getenv("GMAIL_MAX_RETRIES", 5))
+    GMAIL_BACKOFF_BASE = float(os.getenv("GMAIL_BACKOFF_BASE", 1.0))
+    GMAIL_BACKOFF_MAX = float(os.getenv("GMAIL_BACKOFF_MAX", 32.0))
+    AI_REPLY_CONCURRENCY = int(os.getenv("AI_REPLY_CONCURRENCY", 8))
+    REPLY_CACHE_TTL = int(os.getenv("REPLY_CACHE_TTL", 7 * 24 * 3600))
+    REPLY_CACHE_MAX_ENTRIES = int(os.getenv("REPLY_CACHE_MAX_ENTRIES", 5000))
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", 1024))
+    GEMINI_TEMPERATURE = float(os.getenv("GEMINI_TEMPERATURE", 0.7))
+    PREGEN_ENABLED = os.getenv("PREGEN_ENABLED", "false").lower() in ("1", "true", "yes")
+    PREGEN_CONCURRENCY = int(os.getenv("PREGEN_CONCURRENCY", 2))
+    PREGEN_HOURLY_BUDGET = int(os.getenv("PREGEN_HOURLY_BUDGET", 100))
+    PREGEN_SCAN_INTERVAL = float(os.getenv("PREGEN_SCAN_INTERVAL", 30))
+    PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", 2000))
+    DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", 0.7))
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 30))
+    GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", 5))
+    GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", 30))
+    BULK_SEND_MODE = os.getenv("BULK_SEND_MODE", "direct")
+    DRAFT_LIST_TTL = float(os.getenv("DRAFT_LIST_TTL", 60))
+    SEND_PER_MINUTE = int(os.getenv("SEND_PER_MINUTE", 20))
+    SEND_PER_HOUR = int(os.getenv("SEND_PER_HOUR", 200))
+    SEND_PER_DAY = int(os.getenv("SEND_PER_DAY", 500))
+    SEND_DOMAIN_SPACING = float(os.getenv("SEND_DOMAIN_SPACING", 2))
+    DATABASE_PATH = os.getenv("DATABASE_PATH", "replied_emails.db")
+    SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", 16384))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", 8))
+    SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", 256))
@@ -0,0 +1,109 @@
+import logging
+import sqlite3
+import threading
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# WAL lets the dashboard read while a fetch or bulk send is writing; NORMAL sync is safe under WAL
+# and skips an fsync per commit. busy_timeout makes a second writer wait instead of failing at once.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{Config.SQLITE_CACHE_KB}",
+    f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Open connections to one database, handed out one caller at a time and reused, so each keeps
+# its prepared-statement cache and pragmas instead of paying for them on every request
+class ConnectionPool:
+    def __init__(self, db_path, max_idle=None):
+        self.db_path = db_path
+        self.max_idle = Config.SQLITE_POOL_SIZE if max_idle is None else max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Pooled connections move between threads, but only one caller holds each at a time
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=Config.SQLITE_STATEMENT_CACHE
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        return PooledConnection(self, conn or self._open())
+
+    # Uncommitted work is rolled back, as sqlite3's close() would; the connection is kept if there is room
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error(f"⚠️ Dropping broken database connection: {e}")
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+# A borrowed connection; close() returns it to the pool. Everything else behaves like sqlite3.Connection
+class PooledConnection:
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(self._conn, name)
+
+    # "with conn:" commits or rolls back a transaction, like sqlite3.Connection
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=None):
+    db_path = db_path or Config.DATABASE_PATH
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+# Drop-in for sqlite3.connect(path): a tuned, reused connection; call close() when done as before
+def connect(db_path=None):
+    return get_pool(db_path).acquire()
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
@@ -0,0 +1,115 @@
+from functools import lru_cache
+import hashlib
+import logging
+import random
+import re
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# MinHash signature length and LSH banding; 8 bands of 4 rows surface pairs above roughly 0.6 Jaccard similarity
+NUM_PERM = 32
+LSH_BANDS = 8
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_CHARS = 5
+# Only the start of a body is shingled; near-duplicates already agree there
+MAX_SHINGLE_CHARS = 2000
+
+# XOR with a random 64-bit mask permutes the hash space; map(mask.__xor__) keeps the inner loop in C
+_rng = random.Random(42)  # fixed seed so signatures are comparable across runs
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+# Short opening and closing lines ("Dear Sir,", "Regards,\nAli") differ per sender but not per question
+GREETING_RE = re.compile(r"^\s*(dear|hi|hello|hey|respected|assalam\w*|salam|good (morning|afternoon|evening))\b[^\n]{0,40}\n", re.IGNORECASE)
+SIGN_OFF_RE = re.compile(r"\n\s*(regards|best regards|kind regards|thanks|thank you|sincerely|best|cheers)\b[^\n]{0,20}(\n[^\n]{0,40}){0,3}\s*$", re.IGNORECASE)
+
+# Text that decides whether two emails are near-duplicates: subject plus body without greeting and sign-off lines
+def similarity_text(subject, body):
+    body = GREETING_RE.sub('', (body or '').strip() + '\n', count=1)
+    return f"{subject or ''}\n{SIGN_OFF_RE.sub('', body)}"
+
+def _hash64(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little')
+
+# Character 5-grams of the lowercased words, hashed to 64-bit ints; robust to a changed name or word
+def shingles(text):
+    normalized = ' '.join(WORD_RE.findall((text or '')[:MAX_SHINGLE_CHARS].lower()))
+    if len(normalized) <= SHINGLE_CHARS:
+        return {_hash64(normalized)} if normalized else set()
+    return {_hash64(gram) for gram in {normalized[i:i + SHINGLE_CHARS] for i in range(len(normalized) - SHINGLE_CHARS + 1)}}
+
+def minhash(shingle_hashes):
+    if not shingle_hashes:
+        return None
+    return tuple(min(map(mask.__xor__, shingle_hashes)) for mask in _MASKS)
+
+# Bulk pages re-cluster the same emails on every load, so signatures are memoized by text
+@lru_cache(maxsize=5000)
+def text_signature(text):
+    return minhash(shingles(text))
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+# Group near-duplicate texts; items is a list of (key, text)
+# Returns clusters as lists of keys, largest first, each in input order; singletons included
+def cluster_texts(items, threshold=None):
+    threshold = Config.DEDUPE_THRESHOLD if threshold is None else threshold
+    keys = [key for key, _ in items]
+    signatures = [text_signature(text) for _, text in items]
+
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # LSH: only pairs sharing a whole band of the signature are compared
+    buckets = {}
+    for index, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        for band in range(LSH_BANDS):
+            bucket = (band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            buckets.setdefault(bucket, []).append(index)
+
+    compared = set()
+    for members in buckets.values():
+        first = members[0]
+        for other in members[1:]:
+            pair = (first, other)
+            if pair in compared:
+                continue
+            compared.add(pair)
+            if find(first) != find(other) and estimated_similarity(signatures[first], signatures[other]) >= threshold:
+                parent[find(other)] = find(first)
+
+    groups = {}
+    for index in range(len(items)):
+        groups.setdefault(find(index), []).append(keys[index])
+    return sorted(groups.values(), key=len, reverse=True)
+
+# Map each key to the size of its cluster
+def cluster_sizes(clusters):
+    return {key: len(cluster) for cluster in clusters for key in cluster}
+
+# First name from a sender like "Ali Khan <ali@example.com>" or "ali.khan@example.com"
+def sender_first_name(sender):
+    sender = (sender or '').strip()
+    display = sender.split('<')[0].strip().strip('"')
+    if display and '@' not in display:
+        return display.split()[0]
+    local = sender.strip('<>').split('@')[0]
+    first = re.split(r'[._\-+0-9]', local)[0]
+    return first.capitalize() if first else ''
+
+# Reuse a reply written for one sender for another by swapping the first name where it appears
+def personalize_reply(reply, from_sender, to_sender):
+    old_name, new_name = sender_first_name(from_sender), sender_first_name(to_sender)
+    if not reply or not old_name or not new_name or old_name.lower() == new_name.lower():
+        return reply
+    return re.sub(rf'\b{re.escape(old_name)}\b', new_name, reply, flags=re.IGNORECASE)
@@ -0,0 +1,84 @@
+from datetime import datetime
+import logging
+import threading
+import time
+from config import Config
+from gmail_quota import gmail_execute
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest page drafts.list allows
+DRAFT_PAGE_SIZE = 500
+
+# None for missing draft ids, including the "None" string older code stored
+def normalize_draft_id(draft_id):
+    if not draft_id or str(draft_id).strip() in ("None", "null"):
+        return None
+    return draft_id
+
+# Page through drafts.list once and return every live draft id
+def list_live_draft_ids(service, user_id="me"):
+    ids = set()
+    page_token = None
+    pages = 0
+    while True:
+        response = gmail_execute('drafts.list', service.users().drafts().list(
+            userId=user_id, maxResults=DRAFT_PAGE_SIZE, pageToken=page_token, fields="drafts/id,nextPageToken"
+        ))
+        pages += 1
+        ids.update(draft['id'] for draft in response.get('drafts', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    logger.info(f"📝 Listed {len(ids)} live drafts in {pages} pages")
+    return ids
+
+# Live draft ids, listed at most once per ttl; drafts this app creates or sends update the set in place
+class LiveDrafts:
+    def __init__(self, ttl=None):
+        self.ttl = Config.DRAFT_LIST_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._ids = None
+        self._listed_at = 0.0
+
+    def ids(self, service, refresh=False):
+        with self._lock:
+            if refresh or self._ids is None or time.monotonic() - self._listed_at >= self.ttl:
+                self._ids = list_live_draft_ids(service)
+                self._listed_at = time.monotonic()
+            return set(self._ids)
+
+    def add(self, draft_id):
+        with self._lock:
+            if self._ids is not None:
+                self._ids.add(draft_id)
+
+    def discard(self, draft_id):
+        with self._lock:
+            if self._ids is not None:
+                self._ids.discard(draft_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+
+live_drafts = LiveDrafts()
+
+# Check rows' draft ids against the live set; rows is a list of (message_id, draft_id)
+# Stale ids are cleared in one transaction. Returns {message_id: live draft id or None}
+def reconcile_draft_ids(conn, rows, live_ids):
+    reconciled = {}
+    stale = []
+    for message_id, draft_id in rows:
+        live = normalize_draft_id(draft_id)
+        if live and live not in live_ids:
+            live = None
+        reconciled[message_id] = live
+        if draft_id is not None and live is None:
+            stale.append(message_id)
+    if stale:
+        with conn:
+            conn.executemany("UPDATE replied_emails SET draft_id=NULL WHERE message_id=?", [(message_id,) for message_id in stale])
+        logger.info(f"🧹 Cleared {len(stale)} stale draft ids")
+    return reconciled
@@ -1,11 +1,10 @@
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+from gmail_service import get_gmail_service
+from gmail_quota import gmail_execute
 from email.mime.text import MIMEText
 import base64
 
 def create_draft(to, subject, message_text):
-    creds = Credentials.from_authorized_user_file('token.json', ['https://www.googleapis.com/auth/gmail.modify'])
-    service = build('gmail', 'v1', credentials=creds)
+    service = get_gmail_service()
 
     message = MIMEText(message_text)
     message['to'] = to
@@ -17,5 +16,5 @@ def create_draft(to, subject, message_text):
         }
     }
 
-    draft = service.users().drafts().create(userId='me', body=create_message).execute()
+    draft = gmail_execute('drafts.create', service.users().drafts().create(userId='me', body=create_message))
     print(f"✅ Draft created with ID: {draft['id']}")
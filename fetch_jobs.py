@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import threading
+import uuid
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fetches block on Gmail and SQLite, so they run on worker threads instead of the event loop
+executor = ThreadPoolExecutor(max_workers=Config.FETCH_WORKERS, thread_name_prefix="fetch")
+
+jobs = {}
+active_jobs = {}  # mailbox -> job_id of the fetch currently queued or running
+jobs_lock = threading.Lock()
+
+# Finished jobs kept around for status lookups
+MAX_FINISHED_JOBS = 50
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# Start a background fetch for a mailbox, or join the one already in progress
+# Returns (job, merged) where merged is True if an existing job was reused
+def start_fetch_job(mailbox, fetch_fn):
+    with jobs_lock:
+        job_id = active_jobs.get(mailbox)
+        if job_id:
+            logger.info(f"🔁 Fetch for {mailbox} already in progress, joining job {job_id}")
+            return dict(jobs[job_id]), True
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "mailbox": mailbox,
+            "status": "queued",
+            "pages": 0,
+            "listed": 0,
+            "fetched": 0,
+            "errors": 0,
+            "last_error": None,
+            "created_at": _now(),
+            "finished_at": None,
+            "result": None
+        }
+        jobs[job["job_id"]] = job
+        active_jobs[mailbox] = job["job_id"]
+        _prune_finished_jobs()
+
+    executor.submit(_run_fetch_job, job, fetch_fn)
+    logger.info(f"🚀 Started fetch job {job['job_id']} for {mailbox}")
+    return dict(job), False
+
+def _run_fetch_job(job, fetch_fn):
+    def on_progress(pages, listed, fetched, errors=0):
+        with jobs_lock:
+            job.update(pages=pages, listed=listed, fetched=fetched, errors=errors)
+
+    with jobs_lock:
+        job["status"] = "running"
+    try:
+        result = fetch_fn(on_progress=on_progress)
+        with jobs_lock:
+            job["result"] = result
+            job["status"] = "completed" if result.get("success") else "failed"
+            if not result.get("success"):
+                job["errors"] += 1
+                job["last_error"] = result.get("message")
+    except Exception as e:
+        logger.error(f"⚠️ Fetch job {job['job_id']} crashed: {e}")
+        with jobs_lock:
+            job["status"] = "failed"
+            job["errors"] += 1
+            job["last_error"] = str(e)
+    finally:
+        with jobs_lock:
+            job["finished_at"] = _now()
+            active_jobs.pop(job["mailbox"], None)
+        logger.info(f"🏁 Fetch job {job['job_id']} {job['status']}: {job['fetched']} new emails over {job['pages']} pages")
+
+# Drop the oldest finished jobs once there are more than MAX_FINISHED_JOBS (caller holds jobs_lock)
+def _prune_finished_jobs():
+    finished = [job_id for job_id, job in jobs.items() if job["finished_at"]]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del jobs[job_id]
+
+# Snapshot of a job's progress, or None if unknown
+def get_fetch_job(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job else None
@@ -0,0 +1,199 @@
+from collections import defaultdict, deque
+import logging
+import threading
+import time
+import google.generativeai as genai
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One GenerativeModel per (model name, generation config), built on first use and shared by all threads
+_models = {}
+_lock = threading.Lock()
+_configured = False
+
+def _configure():
+    global _configured
+    if not _configured:
+        if not Config.GOOGLE_API_KEY:
+            raise ValueError("❌ GOOGLE_API_KEY not found in environment")
+        genai.configure(api_key=Config.GOOGLE_API_KEY)
+        _configured = True
+
+# Generation settings, defaulting to the central ones in Config
+def generation_settings(model_name=None, max_output_tokens=None, temperature=None):
+    return (
+        model_name or Config.GEMINI_MODEL,
+        max_output_tokens or Config.GEMINI_MAX_OUTPUT_TOKENS,
+        Config.GEMINI_TEMPERATURE if temperature is None else temperature
+    )
+
+# Stable text form of the settings, used in reply cache keys so a config change never serves stale replies
+def model_signature(model_name=None, max_output_tokens=None, temperature=None):
+    name, max_tokens, temp = generation_settings(model_name, max_output_tokens, temperature)
+    return f"{name}|max_output_tokens={max_tokens}|temperature={temp}"
+
+def get_model(model_name=None, max_output_tokens=None, temperature=None):
+    key = generation_settings(model_name, max_output_tokens, temperature)
+    model = _models.get(key)
+    if model:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if not model:
+            _configure()
+            name, max_tokens, temp = key
+            model = genai.GenerativeModel(
+                model_name=name,
+                generation_config=genai.GenerationConfig(max_output_tokens=max_tokens, temperature=temp)
+            )
+            _models[key] = model
+            logger.info(f"✅ Gemini model {name} ready (max_output_tokens={max_tokens}, temperature={temp})")
+    return model
+
+class CircuitOpenError(Exception):
+    pass
+
+# Opens after failure_threshold consecutive failures so callers fall back at once instead of waiting on a dead API;
+# after reset_timeout one half-open probe goes through, and its result closes or re-opens the circuit
+class CircuitBreaker:
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or Config.GEMINI_BREAKER_FAILURES
+        self.reset_timeout = Config.GEMINI_BREAKER_RESET if reset_timeout is None else reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("✅ Gemini circuit closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"⚠️ Gemini circuit open after {self.failures} failures; serving fallbacks for {self.reset_timeout:.0f}s")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    # A probe that ended without a verdict (e.g. an abandoned stream) lets the next call probe again
+    def release(self):
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+# Rolling window of call durations for one model
+class LatencyStats:
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self._samples.append(seconds)
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            calls, errors = self.calls, self.errors
+        percentiles = {
+            f"p{p}_ms": round(samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000) if samples else None
+            for p in (50, 90, 95, 99)
+        }
+        return {"calls": calls, "errors": errors, **percentiles}
+
+_breakers = defaultdict(CircuitBreaker)
+_latency = defaultdict(LatencyStats)
+
+def _request_options():
+    return {"timeout": Config.GEMINI_TIMEOUT}
+
+def _check_breaker(name):
+    if not _breakers[name].allow():
+        raise CircuitOpenError(f"Gemini circuit open for {name}")
+
+# Generate text for a prompt with the shared model; raises on errors, timeouts, an open circuit or an empty response
+def generate_text(prompt, model_name=None, max_output_tokens=None, temperature=None):
+    name = generation_settings(model_name)[0]
+    _check_breaker(name)
+    started = time.monotonic()
+    try:
+        response = get_model(model_name, max_output_tokens, temperature).generate_content(prompt, request_options=_request_options())
+        text = getattr(response, 'text', '') if response else ''
+        if not text or not text.strip():
+            raise ValueError("Empty response from Gemini")
+    except Exception:
+        _breakers[name].record_failure()
+        _latency[name].record(time.monotonic() - started, ok=False)
+        raise
+    _breakers[name].record_success()
+    _latency[name].record(time.monotonic() - started)
+    return text.strip()
+
+# Yield text chunks as Gemini produces them; raises on errors, timeouts, an open circuit or if nothing was produced
+def stream_text(prompt, model_name=None, max_output_tokens=None, temperature=None):
+    name = generation_settings(model_name)[0]
+    _check_breaker(name)
+    started = time.monotonic()
+    finished = False
+    try:
+        response = get_model(model_name, max_output_tokens, temperature).generate_content(
+            prompt, stream=True, request_options=_request_options()
+        )
+        produced = False
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a final safety or finish-reason chunk)
+                continue
+            if text:
+                produced = True
+                yield text
+        if not produced:
+            raise ValueError("Empty response from Gemini")
+        finished = True
+        _breakers[name].record_success()
+        _latency[name].record(time.monotonic() - started)
+    except Exception:
+        finished = True
+        _breakers[name].record_failure()
+        _latency[name].record(time.monotonic() - started, ok=False)
+        raise
+    finally:
+        if not finished:
+            _breakers[name].release()
+
+# Circuit state and latency percentiles per model, for the /gemini_stats endpoint
+def get_gemini_stats():
+    names = set(_breakers) | set(_latency)
+    return {
+        name: {"circuit": _breakers[name].snapshot(), "latency": _latency[name].snapshot()}
+        for name in sorted(names)
+    }
@@ -1,32 +1,15 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
 import logging
+from config import Config
+from gemini_client import generate_text, model_signature
+from prompt_builder import build_prompt, clean_body
+from reply_cache import reply_cache, reply_cache_key
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load .env variables
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-# Check if API Key exists
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GOOGLE_API_KEY not found in environment")
-
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-
-# Initialize Gemini Flash 1.5 model
-model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-# Email response generator
-def generate_email_reply(subject: str, body: str) -> str:
-    try:
-        if not subject or not body:
-            raise ValueError("Subject and body are required")
-
-        prompt = f"""
+# Filled with subject and body; part of the reply cache key
+PROMPT_TEMPLATE = """
         You are an assistant for Rao Faizan Raza, an IT Instructor at Al-Khair Institute.
         Here's an email with subject: "{subject}" and body: "{body}".
 
@@ -38,17 +21,23 @@ def generate_email_reply(subject: str, body: str) -> str:
         Next.js & TypeScript | Passionate about EdTech & AI | Cloud & GenAI Student at GIAIC
         """
 
-        # Generate the reply
-        response = model.generate_content(prompt)
+# Call Gemini; raises on failure so errors are never cached
+def request_reply(subject: str, body: str) -> str:
+    # Generate the reply with the shared model configured in Config
+    prompt, _ = build_prompt(PROMPT_TEMPLATE, subject, body, body_field='body')
+    reply = generate_text(prompt)
+    logger.info("✅ Reply generated successfully")
+    return reply
 
-        # Check if Gemini responded correctly
-        if not response or not getattr(response, 'text', '').strip():
-            raise ValueError("Empty response from Gemini")
+# Email response generator; identical emails are answered from reply_cache unless force=True
+def generate_email_reply(subject: str, body: str, force: bool = False) -> str:
+    try:
+        if not subject or not body:
+            raise ValueError("Subject and body are required")
 
-        logger.info("✅ Reply generated successfully")
-        return response.text.strip()
+        key = reply_cache_key(subject, clean_body(body), PROMPT_TEMPLATE, None, model_signature())
+        return reply_cache.get_or_generate(key, lambda: request_reply(subject, body), force=force, model_name=Config.GEMINI_MODEL)
 
     except Exception as e:
         logger.error(f"⚠️ Failed to generate reply: {e}")
         return "Sorry, something went wrong while generating the reply."
-
@@ -1,15 +1,16 @@
 from datetime import datetime
-import os
-import json
 import base64
-import sqlite3
 from dotenv import load_dotenv
 from email.mime.text import MIMEText
-from reply_db import init_db, save_email_reply
+import db
+from reply_db import init_db, EmailBatchWriter, init_replied_ids, filter_replied_ids, save_replied_ids
 from generate_reply import generate_email_reply
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from gmail_sync import fetch_messages_batched, iter_sync_pages, init_sync_state, load_history_checkpoint, save_history_checkpoint
+from config import Config
+from mime_body import extract_body as extract_mime_body
+from sanitize import to_plain_text, make_preview
+from gmail_service import get_gmail_service
+from gmail_quota import gmail_execute
 import re
 import logging
 
@@ -19,56 +20,8 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Gmail API setup
-SCOPES = ['https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.send']
-
-def get_credentials():
-    credentials_path = os.getenv("GOOGLE_CREDENTIALS_PATH", "token.json")
-    creds = None
-    if os.path.exists(credentials_path):
-        try:
-            creds = Credentials.from_authorized_user_file(credentials_path, SCOPES)
-            logger.info("✅ Loaded credentials from token.json")
-        except Exception as e:
-            logger.error(f"⚠️ Error loading token.json: {e}")
-    
-    if not creds or not creds.valid:
-        try:
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-            with open(credentials_path, 'w') as token_file:
-                token_file.write(creds.to_json())
-            logger.info("✅ New token.json generated")
-        except Exception as e:
-            logger.error(f"⚠️ Error generating token: {e}")
-            raise
-    return creds
-
 # Initialize Gmail service
-service = build('gmail', 'v1', credentials=get_credentials())
-
-REPLIED_LOG_FILE = "replied_log.json"
-
-def load_replied_ids():
-    if os.path.exists(REPLIED_LOG_FILE):
-        try:
-            with open(REPLIED_LOG_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"⚠️ Error loading replied_log.json: {e}")
-            return []
-    return []
-
-def save_replied_id(email_id):
-    try:
-        replied = load_replied_ids()
-        if email_id not in replied:
-            replied.append(email_id)
-            with open(REPLIED_LOG_FILE, 'w') as f:
-                json.dump(replied, f)
-            logger.info(f"✅ Saved replied ID: {email_id}")
-    except Exception as e:
-        logger.error(f"⚠️ Error saving replied ID: {e}")
+service = get_gmail_service()
 
 def sanitize_html(html):
     safe_tags = ['div', 'p', 'a', 'img', 'br', 'strong', 'em', 'h1', 'h2', 'h3', 'ul', 'li']
@@ -79,38 +32,19 @@ def sanitize_html(html):
     return html
 
 def extract_body(msg):
-    payload = msg.get('payload', {})
-    body_data = ""
-
-    def find_part(parts, mime_type):
-        for part in parts:
-            if part['mimeType'] == mime_type:
-                return part['body'].get('data', '')
-            elif part.get('parts'):
-                nested = find_part(part['parts'], mime_type)
-                if nested:
-                    return nested
-        return ''
-
-    # Try HTML first, then plain text
-    for mime_type in ['text/html', 'text/plain']:
-        if 'parts' in payload:
-            body_data = find_part(payload['parts'], mime_type)
-        else:
-            if payload.get('mimeType') == mime_type:
-                body_data = payload.get('body', {}).get('data', '')
-        
-        if body_data:
-            try:
-                decoded = base64.urlsafe_b64decode(body_data.encode('ASCII')).decode('utf-8')
-                if mime_type == 'text/html':
-                    return sanitize_html(decoded)
-                return decoded
-            except Exception as e:
-                logger.error(f"⚠️ Error decoding body: {e}")
-                return "<p>Error: Could not load email content.</p>"
-    
-    return "<p>No content available.</p>"
+    try:
+        body, mime_type, truncated = extract_mime_body(msg.get('payload', {}))
+    except Exception as e:
+        logger.error(f"⚠️ Error decoding body: {e}")
+        return "<p>Error: Could not load email content.</p>"
+
+    if not body:
+        return "<p>No content available.</p>"
+    if truncated:
+        logger.warning(f"⚠️ Body of email {msg.get('id')} truncated to {Config.MAX_BODY_BYTES} bytes")
+    if mime_type == 'text/html':
+        return sanitize_html(body)
+    return body
 
 def create_draft(to, subject, message_text):
     try:
@@ -118,7 +52,7 @@ def create_draft(to, subject, message_text):
         message['to'] = to
         message['subject'] = subject
         raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        draft = service.users().drafts().create(userId='me', body={'message': {'raw': raw}}).execute()
+        draft = gmail_execute('drafts.create', service.users().drafts().create(userId='me', body={'message': {'raw': raw}}))
         draft_id = draft.get('id')
         logger.info(f"📝 Draft created: {draft_id}")
         return draft_id
@@ -126,76 +60,106 @@ def create_draft(to, subject, message_text):
         logger.error(f"⚠️ Error creating draft: {e}")
         return None
 
-def fetch_emails():
-    replied_ids = load_replied_ids()
-
+# Generate a reply and draft for one fetched email, returning the row to save (or None to skip)
+def process_email(message_id, data):
     try:
-        results = service.users().messages().list(
-            userId='me',
-            q="in:inbox",
-            maxResults=10
-        ).execute()
-    except Exception as e:
-        logger.error(f"⚠️ Error fetching emails: {e}")
-        return
+        headers = data['payload']['headers']
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
+        body = extract_body(data)
 
-    messages = results.get('messages', [])
-    logger.info(f"📨 Total Emails Found: {len(messages)}\n")
+        if not body or body == "<p>No content available.</p>":
+            logger.warning(f"⚠️ Skipping email {message_id} due to empty or invalid body")
+            return
+        body_text = to_plain_text(body)
 
-    for msg in messages:
-        if msg['id'] in replied_ids:
-            logger.info(f"📩 [✓] Replied (skipped): {msg['id']}")
-            continue
+        logger.info(f"📩 [ ] New Email From: {sender}")
+        logger.info(f"📝 Subject: {subject}\n")
 
+        # Generate AI reply
         try:
-            data = service.users().messages().get(userId='me', id=msg['id']).execute()
-            headers = data['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
-            message_id = msg['id']
-            body = extract_body(data)
-
-            if not body or body == "<p>No content available.</p>":
-                logger.warning(f"⚠️ Skipping email {msg['id']} due to empty or invalid body")
-                continue
-
-            logger.info(f"📩 [ ] New Email From: {sender}")
-            logger.info(f"📝 Subject: {subject}\n")
-
-            # Generate AI reply
-            try:
-                reply = generate_email_reply(subject, body)
-                logger.info(f"🤖 Gemini's Reply:\n{reply}\n--------------------------------------------------\n")
-            except Exception as e:
-                logger.error(f"⚠️ Failed to generate reply for {subject}: {e}")
-                reply = f"Dear {sender.split('<')[0].strip()},\nThank you for your email. I'll get back to you soon.\nBest regards,\nRao Faizan Raza\nIT Instructor at Al-Khair Institute"
-                logger.warning(f"⚠️ Using fallback reply for {subject}")
-
-            # Create draft in Gmail
-            draft_id = create_draft(
-                to=sender,
-                subject=f"Re: {subject}",
-                message_text=reply
-            )
-            if not draft_id:
-                logger.error(f"⚠️ Skipping email {msg['id']} due to draft creation failure")
-                continue
-
-            # Save to DB
-            contact = sender
-            email_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            reply_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            status = "draft"
-            original_body = body
-
-            save_email_reply(
-                sender, contact, subject, email_date,
-                reply, reply_date, status, original_body, draft_id, message_id
-            )
-
-            save_replied_id(msg['id'])
+            reply = generate_email_reply(subject, body_text)
+            logger.info(f"🤖 Gemini's Reply:\n{reply}\n--------------------------------------------------\n")
         except Exception as e:
-            logger.error(f"⚠️ Error processing email {msg['id']}: {e}")
+            logger.error(f"⚠️ Failed to generate reply for {subject}: {e}")
+            reply = f"Dear {sender.split('<')[0].strip()},\nThank you for your email. I'll get back to you soon.\nBest regards,\nRao Faizan Raza\nIT Instructor at Al-Khair Institute"
+            logger.warning(f"⚠️ Using fallback reply for {subject}")
+
+        # Create draft in Gmail
+        draft_id = create_draft(
+            to=sender,
+            subject=f"Re: {subject}",
+            message_text=reply
+        )
+        if not draft_id:
+            logger.error(f"⚠️ Skipping email {message_id} due to draft creation failure")
+            return
+
+        # Save to DB
+        contact = sender
+        email_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        reply_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        status = "draft"
+        original_body = body
+
+        return (
+            sender, contact, subject, email_date,
+            reply, reply_date, status, original_body, draft_id, message_id,
+            body_text, make_preview(body_text)
+        )
+    except Exception as e:
+        logger.error(f"⚠️ Error processing email {message_id}: {e}")
+        return None
+
+def fetch_emails(max_messages=None, time_budget=None):
+    total_found = 0
+
+    # Resume from the last synced historyId so unchanged mailboxes cost one API call
+    # Checkpoint is kept apart from the dashboard ingest, which syncs the same mailbox into the same database
+    conn = db.connect()
+    init_sync_state(conn)
+    init_replied_ids(conn)
+    mailbox = Config.GMAIL_MAILBOX
+    sync_key = f"{mailbox}:gmail_fetch"
+    sync = {}
+    writer = EmailBatchWriter(conn)
+
+    try:
+        pages_of_ids = iter_sync_pages(service, sync, checkpoint=load_history_checkpoint(conn, sync_key), query="in:inbox", label_ids=['INBOX'], required_labels=['INBOX'], max_messages=max_messages, time_budget=time_budget, user_id=mailbox)
+        for page_number, page_ids in enumerate(pages_of_ids, start=1):
+            total_found += len(page_ids)
+            logger.info(f"📨 Page {page_number}: {len(page_ids)} emails found ({total_found} total)\n")
+
+            replied_ids = filter_replied_ids(conn, page_ids)
+            pending_ids = []
+            for message_id in page_ids:
+                if message_id in replied_ids:
+                    logger.info(f"📩 [✓] Replied (skipped): {message_id}")
+                    continue
+                pending_ids.append(message_id)
+
+            for message_id, data, error in fetch_messages_batched(service, pending_ids, user_id=mailbox):
+                if error:
+                    logger.error(f"⚠️ Error fetching email {message_id}: {error}")
+                    continue
+                row = process_email(message_id, data)
+                if row:
+                    writer.add(row)
+
+            # Save the page in one transaction, then mark its emails as replied
+            saved_ids = [row[9] for row in writer.rows]
+            writer.flush()
+            save_replied_ids(conn, saved_ids)
+
+        if sync.get('history_id'):
+            save_history_checkpoint(conn, sync_key, sync['history_id'])
+    except Exception as e:
+        logger.error(f"⚠️ Error fetching emails: {e}")
+        return
+    finally:
+        conn.close()
+
+    logger.info(f"📨 Total Emails Found: {total_found} ({sync.get('mode')} sync)\n")
 
 if __name__ == "__main__":
     logger.info("📂 Initializing database...")
@@ -0,0 +1,143 @@
+from collections import defaultdict, deque
+import logging
+import random
+import threading
+import time
+from googleapiclient.errors import HttpError
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Gmail API quota units per method (https://developers.google.com/gmail/api/reference/quota)
+QUOTA_UNITS = {
+    'getProfile': 1,
+    'history.list': 2,
+    'messages.list': 5,
+    'messages.get': 5,
+    'messages.send': 100,
+    'drafts.create': 10,
+    'drafts.get': 5,
+    'drafts.list': 5,
+    'drafts.send': 100,
+}
+DEFAULT_UNITS = 5
+
+# True for 429s and the 403 rateLimitExceeded / userRateLimitExceeded errors Gmail uses for throttling
+def is_rate_limit_error(error):
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    content = error.content.decode('utf-8', 'replace') if isinstance(error.content, bytes) else str(error.content)
+    return error.resp.status == 403 and 'ratelimitexceeded' in content.lower()
+
+# Seconds the server asked us to wait, if it said
+def retry_after(error):
+    try:
+        return float(error.resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+# Token bucket over Gmail quota units with usage tracking and throttling backoff, shared by all threads
+class GmailQuotaLimiter:
+    def __init__(self, units_per_second=None, burst=None, max_retries=None, base_delay=None, max_delay=None):
+        self.rate = units_per_second or Config.GMAIL_QUOTA_UNITS_PER_SECOND
+        self.capacity = burst or self.rate
+        self.max_retries = Config.GMAIL_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = Config.GMAIL_BACKOFF_BASE if base_delay is None else base_delay
+        self.max_delay = Config.GMAIL_BACKOFF_MAX if max_delay is None else max_delay
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._recent = deque()  # (timestamp, units) over the last minute
+        self._units_by_method = defaultdict(int)
+        self._throttled = 0
+        self._retries = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Block until `units` quota units are available, then spend them
+    # Costs above the bucket size (large batches) are taken in bucket-sized steps
+    def acquire(self, method, units=None):
+        units = units or QUOTA_UNITS.get(method, DEFAULT_UNITS)
+        while units > 0:
+            step = min(units, self.capacity)
+            self._take(method, step)
+            units -= step
+
+    def _take(self, method, units):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= units:
+                    self._tokens -= units
+                    self._recent.append((now, units))
+                    self._units_by_method[method] += units
+                    return
+                wait = (units - self._tokens) / self.rate
+            time.sleep(wait)
+
+    # Gmail said we are going too fast: empty the bucket so every caller slows down, not just this one
+    def _penalize(self):
+        with self._lock:
+            self._throttled += 1
+            self._tokens = min(self._tokens, 0.0)
+
+    def backoff_delay(self, attempt, error=None):
+        server_delay = retry_after(error) if error is not None else None
+        if server_delay:
+            return server_delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    # Spend quota for `method`, run the request, and retry with jittered exponential backoff when throttled
+    def execute(self, method, request, units=None):
+        attempt = 0
+        while True:
+            self.acquire(method, units)
+            try:
+                return request.execute()
+            except HttpError as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                self._penalize()
+                delay = self.backoff_delay(attempt, e)
+                attempt += 1
+                with self._lock:
+                    self._retries += 1
+                logger.warning(f"⏳ Gmail throttled {method}; retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    # Sleep before retrying throttled calls from a batch
+    def wait_after_throttle(self, attempt):
+        self._penalize()
+        with self._lock:
+            self._retries += 1
+        time.sleep(self.backoff_delay(attempt))
+
+    # Current quota use, for the /gmail_quota endpoint and logs
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            while self._recent and now - self._recent[0][0] > 60:
+                self._recent.popleft()
+            used_last_minute = sum(units for _, units in self._recent)
+            return {
+                "units_per_second": self.rate,
+                "available_units": round(self._tokens, 1),
+                "units_last_minute": used_last_minute,
+                "limit_per_minute": self.rate * 60,
+                "units_by_method": dict(self._units_by_method),
+                "throttled": self._throttled,
+                "retries": self._retries
+            }
+
+gmail_limiter = GmailQuotaLimiter()
+
+# Run a Gmail API request through the shared quota limiter
+def gmail_execute(method, request, units=None):
+    return gmail_limiter.execute(method, request, units)
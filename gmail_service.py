@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import threading
+import httplib2
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request as GoogleRequest
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Process-wide holder for Gmail credentials and API clients
+# Credentials are loaded once and refreshed ahead of expiry under a lock. httplib2 connections are not
+# thread-safe, so each thread gets its own client whose keep-alive connections are reused across calls.
+class GmailServiceHolder:
+    def __init__(self, token_path=None, client_secrets_path=None, scopes=None, refresh_margin=None):
+        self.token_path = token_path or Config.GOOGLE_CREDENTIALS_PATH
+        self.client_secrets_path = client_secrets_path or Config.CLIENT_SECRETS_PATH
+        self.scopes = scopes or Config.SCOPES
+        self.refresh_margin = timedelta(seconds=Config.GMAIL_TOKEN_REFRESH_MARGIN if refresh_margin is None else refresh_margin)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._override = None
+
+    # Swap in a service (or a zero-argument factory) for tests; pass None to go back to the real client
+    def override(self, service):
+        with self._lock:
+            self._override = service
+            self._local = threading.local()
+
+    # Valid credentials, loading token.json on first use and refreshing shortly before expiry
+    def get_credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load_credentials()
+            elif self._expires_soon(self._creds):
+                self._refresh(self._creds)
+            return self._creds
+
+    def get_service(self):
+        override = self._override
+        if override is not None:
+            return override() if callable(override) else override
+
+        creds = self.get_credentials()
+        service = getattr(self._local, "service", None)
+        if service is None:
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=Config.GMAIL_HTTP_TIMEOUT))
+            service = build("gmail", "v1", http=http, cache_discovery=False)
+            self._local.service = service
+            logger.info(f"🔌 Gmail client built for thread {threading.current_thread().name}")
+        return service
+
+    def _load_credentials(self):
+        creds = None
+        if os.path.exists(self.token_path):
+            creds = Credentials.from_authorized_user_file(self.token_path, self.scopes)
+        if creds and creds.refresh_token and (not creds.valid or self._expires_soon(creds)):
+            self._refresh(creds)
+        if not creds or not creds.valid:
+            flow = InstalledAppFlow.from_client_secrets_file(self.client_secrets_path, self.scopes)
+            creds = flow.run_local_server(port=0)
+            self._save(creds)
+        return creds
+
+    def _expires_soon(self, creds):
+        if not creds.expiry:
+            return not creds.valid
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - self.refresh_margin <= now
+
+    def _refresh(self, creds):
+        creds.refresh(GoogleRequest())
+        self._save(creds)
+        logger.info("🔑 Gmail token refreshed")
+
+    def _save(self, creds):
+        with open(self.token_path, "w") as token_file:
+            token_file.write(creds.to_json())
+
+gmail_services = GmailServiceHolder()
+
+# Shared Gmail API client for the calling thread
+def get_gmail_service():
+    return gmail_services.get_service()
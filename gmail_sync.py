@@ -0,0 +1,184 @@
+from datetime import datetime
+from itertools import islice
+import logging
+import time
+from googleapiclient.errors import HttpError
+from config import Config
+from gmail_quota import QUOTA_UNITS, gmail_execute, gmail_limiter, is_rate_limit_error
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Gmail rejects batches with more than 100 calls
+GMAIL_MAX_BATCH_SIZE = 100
+# messages().list returns at most 500 ids per page
+GMAIL_MAX_PAGE_SIZE = 500
+
+# Split message ids into batch-sized chunks, dropping repeats inside a chunk
+def chunk_ids(message_ids, size):
+    ids = iter(message_ids)
+    while True:
+        chunk = list(dict.fromkeys(islice(ids, size)))
+        if not chunk:
+            return
+        yield chunk
+
+# Fetch messages with Gmail batch requests, yielding (message_id, message, error) as each batch returns
+# Calls throttled inside a batch are retried with backoff through the shared quota limiter
+def fetch_messages_batched(service, message_ids, batch_size=None, format='full', metadata_headers=None, user_id='me'):
+    batch_size = min(batch_size or Config.GMAIL_BATCH_SIZE, GMAIL_MAX_BATCH_SIZE)
+    for chunk in chunk_ids(message_ids, batch_size):
+        results = {}
+        pending = chunk
+        attempt = 0
+        while pending:
+            def on_response(request_id, response, exception):
+                results[request_id] = (response, exception)
+
+            batch = service.new_batch_http_request(callback=on_response)
+            for message_id in pending:
+                params = {'userId': user_id, 'id': message_id, 'format': format}
+                if metadata_headers:
+                    params['metadataHeaders'] = metadata_headers
+                batch.add(service.users().messages().get(**params), request_id=message_id)
+            try:
+                gmail_execute('messages.get', batch, units=QUOTA_UNITS['messages.get'] * len(pending))
+            except Exception as e:
+                logger.error(f"⚠️ Error executing batch of {len(pending)} messages: {e}")
+                for message_id in pending:
+                    results[message_id] = (None, e)
+                break
+
+            throttled = [message_id for message_id in pending if is_rate_limit_error(results.get(message_id, (None, None))[1])]
+            if not throttled or attempt >= gmail_limiter.max_retries:
+                break
+            logger.warning(f"⏳ {len(throttled)} of {len(pending)} batched gets throttled; retrying")
+            gmail_limiter.wait_after_throttle(attempt)
+            attempt += 1
+            pending = throttled
+
+        for message_id in chunk:
+            response, exception = results.get(message_id, (None, Exception("No response in batch")))
+            yield message_id, response, exception
+
+# Page through messages().list following nextPageToken, yielding one page of ids at a time
+# Stops after max_messages ids or once time_budget seconds have passed (0 or None means no limit)
+def iter_message_id_pages(service, query=None, label_ids=None, page_size=None, max_messages=None, time_budget=None, user_id='me'):
+    page_size = min(page_size or Config.FETCH_PAGE_SIZE, GMAIL_MAX_PAGE_SIZE)
+    max_messages = Config.FETCH_MAX_MESSAGES if max_messages is None else max_messages
+    time_budget = Config.FETCH_TIME_BUDGET if time_budget is None else time_budget
+    started = time.monotonic()
+    listed = 0
+    page_token = None
+
+    while True:
+        params = {'userId': user_id, 'maxResults': page_size}
+        if max_messages:
+            params['maxResults'] = min(page_size, max_messages - listed)
+        if query:
+            params['q'] = query
+        if label_ids:
+            params['labelIds'] = label_ids
+        if page_token:
+            params['pageToken'] = page_token
+
+        response = gmail_execute('messages.list', service.users().messages().list(**params))
+        page_ids = [message['id'] for message in response.get('messages', [])]
+        listed += len(page_ids)
+        if page_ids:
+            yield page_ids
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+        if max_messages and listed >= max_messages:
+            logger.info(f"⏹️ Stopped listing after reaching cap of {max_messages} messages")
+            return
+        if time_budget and time.monotonic() - started >= time_budget:
+            logger.info(f"⏹️ Stopped listing after {time_budget}s time budget ({listed} messages listed)")
+            return
+
+# Raised when a stored historyId is too old for history().list and a full resync is needed
+class HistoryExpired(Exception):
+    pass
+
+# Page through history().list from a checkpoint, yielding ids of added or relabelled messages
+# Messages must carry every label in required_labels; sync['history_id'] is advanced as pages arrive
+def iter_history_id_pages(service, start_history_id, sync, label_id=None, required_labels=None, page_size=None, user_id='me'):
+    page_size = min(page_size or Config.FETCH_PAGE_SIZE, GMAIL_MAX_PAGE_SIZE)
+    required = set(required_labels or [])
+    page_token = None
+
+    while True:
+        params = {
+            'userId': user_id,
+            'startHistoryId': start_history_id,
+            'historyTypes': ['messageAdded', 'labelAdded'],
+            'maxResults': page_size
+        }
+        if label_id:
+            params['labelId'] = label_id
+        if page_token:
+            params['pageToken'] = page_token
+
+        try:
+            response = gmail_execute('history.list', service.users().history().list(**params))
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise HistoryExpired(f"historyId {start_history_id} is no longer available") from e
+            raise
+
+        page_ids = []
+        for record in response.get('history', []):
+            changed = record.get('messagesAdded', []) + record.get('labelsAdded', [])
+            for change in changed:
+                message = change['message']
+                if required.issubset(message.get('labelIds', [])):
+                    page_ids.append(message['id'])
+        page_ids = list(dict.fromkeys(page_ids))
+        if page_ids:
+            yield page_ids
+
+        sync['history_id'] = response.get('historyId', sync.get('history_id'))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+# Yield pages of message ids to ingest: incremental from the checkpoint when possible, otherwise a full listing
+# sync['history_id'] holds the checkpoint to store once every page has been processed
+def iter_sync_pages(service, sync, checkpoint=None, query=None, label_ids=None, required_labels=None, max_messages=None, time_budget=None, user_id='me'):
+    if checkpoint:
+        sync['mode'] = 'incremental'
+        label_id = label_ids[0] if label_ids else None
+        try:
+            yield from iter_history_id_pages(service, checkpoint, sync, label_id=label_id, required_labels=required_labels, user_id=user_id)
+            return
+        except HistoryExpired as e:
+            logger.warning(f"⚠️ {e}; falling back to full resync")
+
+    # Take the checkpoint before listing so anything arriving mid-sync is replayed next time
+    sync['mode'] = 'full'
+    sync['history_id'] = gmail_execute('getProfile', service.users().getProfile(userId=user_id)).get('historyId')
+    yield from iter_message_id_pages(service, query=query, label_ids=label_ids, max_messages=max_messages, time_budget=time_budget, user_id=user_id)
+
+# Create the table holding the last synced historyId per mailbox
+def init_sync_state(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            mailbox TEXT PRIMARY KEY,
+            history_id TEXT,
+            updated_at DATETIME
+        )
+    ''')
+    conn.commit()
+
+def load_history_checkpoint(conn, mailbox):
+    row = conn.execute("SELECT history_id FROM sync_state WHERE mailbox=?", (mailbox,)).fetchone()
+    return row[0] if row else None
+
+def save_history_checkpoint(conn, mailbox, history_id):
+    conn.execute('''
+        INSERT INTO sync_state (mailbox, history_id, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(mailbox) DO UPDATE SET history_id = excluded.history_id, updated_at = excluded.updated_at
+    ''', (mailbox, str(history_id), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    conn.commit()
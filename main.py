@@ -1,19 +1,35 @@
 from fastapi import FastAPI, Request, Form, HTTPException, UploadFile, File
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 import sqlite3
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request as GoogleRequest
-from google_auth_oauthlib.flow import InstalledAppFlow
-from email.mime.text import MIMEText
-import base64
 import csv
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
 import asyncio
 import logging
 import os
-import bleach
+import db
+from gmail_sync import fetch_messages_batched, iter_sync_pages, init_sync_state, load_history_checkpoint, save_history_checkpoint
+from googleapiclient.errors import HttpError
+from config import Config
+from gmail_service import gmail_services
+from gmail_quota import gmail_execute, gmail_limiter
+from fetch_jobs import start_fetch_job, get_fetch_job
+from reply_pool import generate_replies
+from pregen_worker import PregenWorker
+from send_rate import send_limiter, recipient_domain
+from bulk_jobs import BulkSendScheduler, create_bulk_job, get_bulk_job, list_bulk_jobs, cancel_bulk_job
+from reply_cache import reply_cache, reply_cache_key, normalize_subject
+from dedupe import cluster_texts, cluster_sizes, similarity_text, personalize_reply
+from gemini_client import generate_text, stream_text, model_signature, get_gemini_stats
+from prompt_builder import build_prompt, clean_body, get_prompt_stats
+from reply_db import init_db, EmailBatchWriter
+from migrate_db import migrate_db
+from mime_body import extract_body
+from draft_sync import live_drafts, reconcile_draft_ids, normalize_draft_id
+from bulk_template import BulkTemplate, TemplateError, template_values
+from reply_message import header_value, reply_subject, new_message_id, build_reply_message
+from sanitize import sanitize_text, to_plain_text, make_preview, prepare_body
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -22,11 +38,24 @@ logger = logging.getLogger(__name__)
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
 
+# Make sure the database has the table and columns ingest relies on
+@app.on_event("startup")
+def prepare_database():
+    init_db()
+    migrate_db()
+
+# Start a background fetch and return its job id right away
 @app.post("/fetch_emails")
 async def fetch_emails():
     try:
-        result = await fetch_emails_from_gmail()
-        return result
+        job, merged = start_fetch_job(Config.GMAIL_MAILBOX, fetch_emails_from_gmail)
+        return {
+            "success": True,
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "merged": merged,
+            "message": "Fetch already in progress" if merged else "Fetch started"
+        }
     except Exception as e:
         logger.error(f"⚠️ Error in fetch_emails endpoint: {e}")
         return {
@@ -34,9 +63,33 @@ async def fetch_emails():
             "message": str(e)
         }
 
-# Sanitize text to prevent XSS
-def sanitize_text(text):
-    return bleach.clean(text, tags=['p', 'strong', 'em', 'a'], attributes={'a': ['href']}) if text else ""
+# Report progress of a background fetch
+@app.get("/fetch_status/{job_id}")
+async def fetch_status(job_id: str):
+    job = get_fetch_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Fetch job not found")
+    return job
+
+# Reply cache hit/miss counts, i.e. Gemini calls saved
+@app.get("/reply_cache_stats")
+async def reply_cache_stats():
+    return reply_cache.stats()
+
+# Prompt sizes before and after cleanup, i.e. tokens saved
+@app.get("/prompt_stats")
+async def prompt_stats():
+    return get_prompt_stats()
+
+# Gemini circuit breaker state and latency percentiles per model
+@app.get("/gemini_stats")
+async def gemini_stats():
+    return get_gemini_stats()
+
+# Current Gmail quota use from the shared limiter
+@app.get("/gmail_quota")
+async def gmail_quota():
+    return gmail_limiter.snapshot()
 
 # Check if email is from a no-reply address
 def is_no_reply_email(email):
@@ -66,137 +119,223 @@ def is_no_reply_email(email):
     return any(pattern in email for pattern in noreply_patterns)
 
 # Gmail API service initialization
+# Credentials and the client are shared process-wide; see gmail_service.GmailServiceHolder
 def get_gmail_service():
     try:
-        SCOPES = ['https://www.googleapis.com/auth/gmail.modify', 'https://www.googleapis.com/auth/gmail.send']
-        creds = None
-        if os.path.exists("token.json"):
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(GoogleRequest())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-                creds = flow.run_local_server(port=0)
-                with open("token.json", "w") as token_file:
-                    token_file.write(creds.to_json())
-        service = build("gmail", "v1", credentials=creds)
-        return service
+        return gmail_services.get_service()
     except Exception as e:
         logger.error(f"⚠️ Error initializing Gmail service: {e}")
         return None
 
-# Create draft in Gmail
-def create_draft(sender, subject, message_text):
+# Create draft in Gmail; thread (see load_reply_thread) keeps the draft in the original conversation
+def create_draft(sender, subject, message_text, thread=None):
     try:
         service = get_gmail_service()
         if not service:
             return None
-        message = MIMEText(message_text)
-        message["to"] = sender
-        message["subject"] = subject
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        draft = {"message": {"raw": raw_message}}
-        draft_response = service.users().drafts().create(userId="me", body=draft).execute()
+        draft = {"message": build_reply_message(sender, subject, message_text, thread)}
+        draft_response = gmail_execute("drafts.create", service.users().drafts().create(userId="me", body=draft))
         draft_id = draft_response["id"]
+        live_drafts.add(draft_id)
         logger.info(f"📝 Draft created: {draft_id}")
         return draft_id
     except Exception as e:
         logger.error(f"⚠️ Error creating draft for {subject}: {e}")
         return None
 
-# Verify draft exists
+# Verify draft exists, against the cached drafts.list result rather than a drafts.get per draft
 def verify_draft(draft_id):
     try:
+        draft_id = normalize_draft_id(draft_id)
         service = get_gmail_service()
         if not service or not draft_id:
             return False
-        draft = service.users().drafts().get(userId="me", id=draft_id).execute()
-        return bool(draft)
+        return draft_id in live_drafts.ids(service)
     except Exception as e:
         logger.error(f"⚠️ Error verifying draft {draft_id}: {e}")
         return False
 
-# Send email with delay
-async def send_email_with_delay(service, draft_id, delay=10):
+# Send a draft; raises on failure
+def send_draft(service, draft_id):
+    message = gmail_execute("drafts.send", service.users().drafts().send(userId="me", body={"id": draft_id}))
+    live_drafts.discard(draft_id)
+    logger.info(f"✅ Email sent from draft: {draft_id}")
+    return message
+
+# Send a reply straight through messages.send, threaded under the original; one API call, no draft
+# Raises on failure; returns the sent message's Gmail id
+def send_message(sender, subject, message_text, thread=None, message_id=None):
+    service = get_gmail_service()
+    if not service:
+        raise Exception("Failed to initialize Gmail service")
+    message = build_reply_message(sender, subject, message_text, thread, message_id=message_id)
+    sent = gmail_execute("messages.send", service.users().messages().send(userId="me", body=message))
+    logger.info(f"✅ Email sent to {sender}: {sent.get('id')}")
+    return sent.get('id')
+
+# True if a message with this Message-ID header is in the mailbox, i.e. it was already sent
+def message_exists(message_id):
+    service = get_gmail_service()
+    if not service:
+        raise Exception("Failed to initialize Gmail service")
+    result = gmail_execute("messages.list", service.users().messages().list(userId="me", q=f"rfc822msgid:{message_id}", includeSpamTrash=True))
+    return bool(result.get('messages'))
+
+# Thread id and headers needed to reply in-thread, from what ingest stored
+def load_reply_thread(message_id):
+    conn = db.connect()
     try:
-        if not service or not draft_id:
-            return False
-        await asyncio.sleep(delay)
-        message = service.users().drafts().send(userId="me", body={"id": draft_id}).execute()
-        logger.info(f"✅ Email sent from draft: {draft_id}")
-        return True
-    except Exception as e:
-        logger.error(f"⚠️ Error sending email from draft {draft_id}: {e}")
-        return False
+        row = conn.execute("SELECT thread_id, header_message_id, header_references FROM replied_emails WHERE message_id=?", (message_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(['thread_id', 'header_message_id', 'header_references'], row)) if row else {}
+
+# Longest wait for a send slot that /send_reply takes inside the request, e.g. spacing after a send to the same domain
+MAX_INLINE_SEND_WAIT = 5
+
+# Headers requested for metadata-only ingest
+METADATA_HEADERS = ['Subject', 'From', 'Date', 'Message-ID', 'References']
+
+# Parse and sanitize a metadata-only Gmail message into a database row
+def build_email_row(message_id, msg):
+    # Extract headers
+    headers = msg['payload']['headers']
+    subject = header_value(headers, 'Subject', 'No Subject')
+    sender = header_value(headers, 'From', 'No Sender')
+    date = int(msg['internalDate']) / 1000  # Convert to seconds
+
+    # Sanitize the data; the snippet stands in for the body until it is first opened
+    subject = sanitize_text(subject)
+    sender = sanitize_text(sender)
+    preview = make_preview(to_plain_text(msg.get('snippet', '')))
+
+    # Check if it's a no-reply email
+    status = 'no-reply' if is_no_reply_email(sender) else 'unread'
+
+    # Kept so replies can be threaded without fetching the message again
+    thread = (msg.get('threadId'), header_value(headers, 'Message-ID'), header_value(headers, 'References'))
+
+    return (message_id, sender, subject, datetime.fromtimestamp(date).strftime("%Y-%m-%d %H:%M:%S"), status, preview, *thread)
+
+# Load (sanitized html, plain text) bodies for the given emails
+# Emails ingested as metadata only are fetched from Gmail once; both forms and the preview are cached in the row
+def hydrate_email_bodies(message_ids):
+    conn = db.connect()
+    c = conn.cursor()
+    bodies = {}
+    missing = []
+    for message_id in message_ids:
+        c.execute("SELECT original_body, body_text, body_fetched FROM replied_emails WHERE message_id=?", (message_id,))
+        row = c.fetchone()
+        if not row:
+            continue
+        body_html, body_text, body_fetched = row
+        if body_fetched == 0:
+            missing.append(message_id)
+            continue
+        if body_text is None:
+            # Rows stored before body_text existed get it filled in on first read
+            body_text = to_plain_text(body_html)
+            c.execute("UPDATE replied_emails SET body_text=?, preview=? WHERE message_id=?", (body_text, make_preview(body_text), message_id))
+        bodies[message_id] = (body_html or "", body_text)
+
+    # Don't hold the write lock across the Gmail round trips below
+    conn.commit()
+    if missing:
+        service = get_gmail_service()
+        if not service:
+            logger.error(f"⚠️ Failed to initialize Gmail service; {len(missing)} email bodies not loaded")
+            conn.close()
+            return bodies
+        for message_id, msg, error in fetch_messages_batched(service, missing, user_id=Config.GMAIL_MAILBOX):
+            if error:
+                logger.error(f"⚠️ Error loading body for email {message_id}: {error}")
+                continue
+            body, mime_type, truncated = extract_body(msg['payload'])
+            body_html, body_text, preview = prepare_body(body)
+            # The full message carries the threading headers too; fill them in for rows ingested before they were kept
+            headers = msg['payload'].get('headers', [])
+            c.execute(
+                '''UPDATE replied_emails SET original_body=?, body_text=?, preview=?, body_fetched=1, body_truncated=?,
+                   thread_id=COALESCE(thread_id, ?), header_message_id=COALESCE(header_message_id, ?), header_references=COALESCE(header_references, ?)
+                   WHERE message_id=?''',
+                (body_html, body_text, preview, int(truncated), msg.get('threadId'), header_value(headers, 'Message-ID'), header_value(headers, 'References'), message_id)
+            )
+            bodies[message_id] = (body_html, body_text)
+        logger.info(f"📥 Loaded {len(missing)} email bodies on first use")
+
+    conn.commit()
+    conn.close()
+    return bodies
+
+# Load the (sanitized html, plain text) body for one email, fetching it from Gmail on first use
+def hydrate_email_body(message_id):
+    return hydrate_email_bodies([message_id]).get(message_id, (None, None))
+
+INGEST_EMAIL_SQL = '''
+    INSERT OR IGNORE INTO replied_emails 
+    (message_id, sender, subject, email_date, status, preview, thread_id, header_message_id, header_references, body_fetched) 
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+'''
 
 # Fetch emails from Gmail
-async def fetch_emails_from_gmail():
+# Streams new mail page by page: each page of ids is fetched, sanitized and inserted before the next is listed
+# Blocking; runs on a fetch_jobs worker thread
+def fetch_emails_from_gmail(max_messages=None, time_budget=None, on_progress=None):
     try:
         service = get_gmail_service()
         if not service:
             raise Exception("Failed to initialize Gmail service")
 
-        # Get emails from Gmail
-        results = service.users().messages().list(userId='me', labelIds=['INBOX'], q='is:unread').execute()
-        messages = results.get('messages', [])
+        conn = db.connect()
+        init_sync_state(conn)
+        writer = EmailBatchWriter(conn, INGEST_EMAIL_SQL)
 
-        if not messages:
-            return {"success": True, "count": 0, "message": "No new emails found"}
-
-        conn = sqlite3.connect('email_log.db')
-        cursor = conn.cursor()
+        # Pull only changes since the last stored historyId; falls back to a full listing without one
+        mailbox = Config.GMAIL_MAILBOX
+        checkpoint = load_history_checkpoint(conn, mailbox)
+        sync = {}
 
         fetched_count = 0
-        for message in messages:
-            try:
-                # Get the email details
-                msg = service.users().messages().get(userId='me', id=message['id'], format='full').execute()
-                
-                # Extract headers
-                headers = msg['payload']['headers']
-                subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-                sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'No Sender')
-                date = int(msg['internalDate']) / 1000  # Convert to seconds
-                
-                # Extract body
-                body = ""
-                if 'parts' in msg['payload']:
-                    for part in msg['payload']['parts']:
-                        if part['mimeType'] == 'text/html':
-                            body = base64.urlsafe_b64decode(part['body']['data']).decode()
-                            break
-                elif 'body' in msg['payload']:
-                    body = base64.urlsafe_b64decode(msg['payload']['body']['data']).decode()
-
-                # Sanitize the data
-                subject = sanitize_text(subject)
-                sender = sanitize_text(sender)
-                body = sanitize_text(body)
-
-                # Check if it's a no-reply email
-                status = 'no-reply' if is_no_reply_email(sender) else 'unread'
-
-                # Save to database
-                cursor.execute('''
-                    INSERT OR IGNORE INTO emails 
-                    (message_id, subject, sender, original_body, email_date, status) 
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (message['id'], subject, sender, body, datetime.fromtimestamp(date), status))
-                
-                if cursor.rowcount > 0:
-                    fetched_count += 1
-
-            except Exception as e:
-                logger.error(f"⚠️ Error processing email {message['id']}: {e}")
-                continue
+        listed_count = 0
+        error_count = 0
+        pages = 0
+        for page_ids in iter_sync_pages(service, sync, checkpoint=checkpoint, query='is:unread', label_ids=['INBOX'], required_labels=['INBOX', 'UNREAD'], max_messages=max_messages, time_budget=time_budget, user_id=mailbox):
+            pages += 1
+            listed_count += len(page_ids)
 
-        conn.commit()
+            # Get headers and snippet in batches; bodies are fetched later on first use
+            for message_id, msg, error in fetch_messages_batched(service, page_ids, format='metadata', metadata_headers=METADATA_HEADERS, user_id=mailbox):
+                if error:
+                    logger.error(f"⚠️ Error fetching email {message_id}: {error}")
+                    error_count += 1
+                    continue
+                try:
+                    writer.add(build_email_row(message_id, msg))
+                except Exception as e:
+                    logger.error(f"⚠️ Error processing email {message_id}: {e}")
+                    error_count += 1
+                    continue
+
+            # Save the page in one transaction so progress survives an interrupted fetch
+            fetched_count += writer.flush()
+            logger.info(f"📄 Page {pages}: {len(page_ids)} emails listed, {fetched_count} new so far")
+            if on_progress:
+                on_progress(pages=pages, listed=listed_count, fetched=fetched_count, errors=error_count)
+
+        if sync.get('history_id'):
+            save_history_checkpoint(conn, mailbox, sync['history_id'])
         conn.close()
+        logger.info(f"🔄 {sync.get('mode', 'full').capitalize()} sync finished at historyId {sync.get('history_id')}")
+
+        if listed_count == 0:
+            return {"success": True, "count": 0, "pages": pages, "sync_mode": sync.get('mode'), "message": "No new emails found"}
 
         return {
             "success": True,
             "count": fetched_count,
+            "pages": pages,
+            "sync_mode": sync.get('mode'),
             "message": f"Successfully fetched {fetched_count} new emails"
         }
 
@@ -207,60 +346,63 @@ async def fetch_emails_from_gmail():
             "message": f"Failed to fetch emails: {str(e)}"
         }
 
-# Initialize Gemini API
-import google.generativeai as genai
+# Gemini models are built once and shared; see gemini_client.py
 from textwrap import dedent
 
-# Configure Gemini
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "YOUR_API_KEY_HERE")  # Set your API key in environment variables
-genai.configure(api_key=GOOGLE_API_KEY)
+# Filled with subject and body_text; part of the reply cache key, so editing it invalidates cached replies
+REPLY_PROMPT_TEMPLATE = dedent("""
+    You are a professional email assistant. Generate a polite and professional reply to this email.
+    Keep the tone friendly but professional. Address the sender's points clearly and concisely.
+    
+    Original Email Subject: {subject}
+    
+    Original Email Content:
+    {body_text}
+    
+    Instructions:
+    1. Start with an appropriate greeting
+    2. Acknowledge the email's content
+    3. Address the main points or questions
+    4. End professionally
+    5. Include a signature
+    
+    Additional Context: Reply as Rao Faizan Raza, IT Instructor at Al-Khair Institute
+""").strip()
 
-def generate_email_reply(subject, original_body, custom_prompt=None):
+# Call Gemini for a reply; raises on failure so errors are never cached
+def request_ai_reply(subject, body_text, custom_prompt=None):
+    # Use custom prompt if provided
+    # Otherwise the body goes in without quoted history or signature, within the prompt token budget
+    prompt = custom_prompt if custom_prompt else build_prompt(REPLY_PROMPT_TEMPLATE, subject, body_text)[0]
+    
+    # Generate response with the shared model configured in Config
+    reply = generate_text(prompt)
+    
+    logger.info("✅ Successfully generated AI reply")
+    return reply + signature_suffix(reply)
+
+# Signature to append when the model left it out
+def signature_suffix(reply):
+    if "Best regards" not in reply and "Sincerely" not in reply:
+        return "\n\nBest regards,\nRao Faizan Raza\nIT Instructor at Al-Khair Institute"
+    return ""
+
+# Keyed on the cleaned body: the same message with different quoted history gets the same reply
+def reply_key(subject, body_text, custom_prompt=None):
+    return reply_cache_key(subject, clean_body(body_text), REPLY_PROMPT_TEMPLATE, custom_prompt, model_signature())
+
+# Reply from reply_cache, or a fresh one from Gemini when missing or force=True; raises on failure
+def generate_cached_reply(subject, body_text, custom_prompt=None, force=False):
+    key = reply_key(subject, body_text, custom_prompt)
+    return reply_cache.get_or_generate(
+        key, lambda: request_ai_reply(subject, body_text, custom_prompt), force=force, model_name=Config.GEMINI_MODEL
+    )
+
+# body_text is the plain-text body stored at ingest (see sanitize.prepare_body)
+# Identical requests are answered from reply_cache; force=True regenerates
+def generate_email_reply(subject, body_text, custom_prompt=None, force=False):
     try:
-        # Clean and prepare the email content
-        clean_body = bleach.clean(original_body, tags=[], strip=True)
-        
-        # Create the base prompt
-        base_prompt = dedent(f"""
-            You are a professional email assistant. Generate a polite and professional reply to this email.
-            Keep the tone friendly but professional. Address the sender's points clearly and concisely.
-            
-            Original Email Subject: {subject}
-            
-            Original Email Content:
-            {clean_body}
-            
-            Instructions:
-            1. Start with an appropriate greeting
-            2. Acknowledge the email's content
-            3. Address the main points or questions
-            4. End professionally
-            5. Include a signature
-            
-            Additional Context: Reply as Rao Faizan Raza, IT Instructor at Al-Khair Institute
-        """).strip()
-        
-        # Use custom prompt if provided
-        prompt = custom_prompt if custom_prompt else base_prompt
-        
-        # Get Gemini model
-        model = genai.GenerativeModel('gemini-pro')
-        
-        # Generate response
-        response = model.generate_content(prompt)
-        
-        if not response.text:
-            raise Exception("Empty response from AI")
-        
-        # Post-process the response
-        reply = response.text.strip()
-        
-        # Ensure signature is present
-        if "Best regards" not in reply and "Sincerely" not in reply:
-            reply += "\n\nBest regards,\nRao Faizan Raza\nIT Instructor at Al-Khair Institute"
-        
-        logger.info("✅ Successfully generated AI reply")
-        return reply
+        return generate_cached_reply(subject, body_text, custom_prompt, force)
         
     except Exception as e:
         logger.error(f"⚠️ Error generating AI reply: {e}")
@@ -275,10 +417,37 @@ def generate_email_reply(subject, original_body, custom_prompt=None):
             IT Instructor at Al-Khair Institute
         """).strip()
 
+# Background reply pre-generation; replies also land in reply_cache, so a later /generate_reply is instant
+pregen_worker = PregenWorker(generate_cached_reply, hydrate_email_bodies)
+
+@app.on_event("startup")
+def start_pregen_worker():
+    if Config.PREGEN_ENABLED:
+        pregen_worker.start()
+
+@app.on_event("shutdown")
+def stop_pregen_worker():
+    pregen_worker.stop()
+
+@app.get("/pregen/status")
+async def pregen_status():
+    return pregen_worker.status()
+
+@app.post("/pregen/pause")
+async def pregen_pause():
+    pregen_worker.pause()
+    return pregen_worker.status()
+
+# Resumes a paused worker, or starts it if PREGEN_ENABLED was off
+@app.post("/pregen/resume")
+async def pregen_resume():
+    pregen_worker.resume()
+    return pregen_worker.status()
+
 # Update email reply in database
 def update_email_reply(sender, subject, reply, draft_id, email_date):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         c.execute('''
             UPDATE replied_emails 
@@ -298,7 +467,7 @@ def update_email_reply(sender, subject, reply, draft_id, email_date):
 # Update draft ID in database
 def update_draft_id_in_db(sender, subject, draft_id, email_date):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         c.execute('''
             UPDATE replied_emails 
@@ -319,20 +488,20 @@ def update_draft_id_in_db(sender, subject, draft_id, email_date):
 @app.get("/", response_class=HTMLResponse)
 async def read_data(request: Request):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         
-        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id FROM replied_emails WHERE status='unread' ORDER BY email_date DESC")
-        unread_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
+        c.execute("SELECT sender, subject, email_date, status, reply, preview, draft_id, message_id FROM replied_emails WHERE status='unread' ORDER BY email_date DESC")
+        unread_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'preview', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
         
-        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id FROM replied_emails WHERE status='sent' ORDER BY email_date DESC")
-        sent_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
+        c.execute("SELECT sender, subject, email_date, status, reply, preview, draft_id, message_id FROM replied_emails WHERE status='sent' ORDER BY email_date DESC")
+        sent_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'preview', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
         
-        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id FROM replied_emails WHERE status='draft' ORDER BY email_date DESC")
-        draft_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
+        c.execute("SELECT sender, subject, email_date, status, reply, preview, draft_id, message_id FROM replied_emails WHERE status='draft' ORDER BY email_date DESC")
+        draft_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'preview', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
         
-        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id FROM replied_emails WHERE status='no-reply' ORDER BY email_date DESC")
-        no_reply_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
+        c.execute("SELECT sender, subject, email_date, status, reply, preview, draft_id, message_id FROM replied_emails WHERE status='no-reply' ORDER BY email_date DESC")
+        no_reply_emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'preview', 'draft_id', 'message_id'], row)) for row in c.fetchall()]
         
         conn.close()
         logger.info(f"✅ Fetched emails: unread={len(unread_emails)}, sent={len(sent_emails)}, draft={len(draft_emails)}, no-reply={len(no_reply_emails)}")
@@ -354,9 +523,9 @@ async def read_data(request: Request):
 
 # Generate reply for a single email
 @app.post("/generate_reply", response_class=HTMLResponse)
-async def generate_reply(request: Request, sender: str = Form(...), subject: str = Form(default='No Subject'), original_body: str = Form(...), message_id: str = Form(...), custom_prompt: str = Form(default=None)):
+async def generate_reply(request: Request, sender: str = Form(...), subject: str = Form(default='No Subject'), original_body: str = Form(default=''), message_id: str = Form(...), custom_prompt: str = Form(default=None), regenerate: bool = Form(default=False)):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         c.execute("SELECT status, email_date FROM replied_emails WHERE message_id=?", (message_id,))
         result = c.fetchone()
@@ -370,7 +539,9 @@ async def generate_reply(request: Request, sender: str = Form(...), subject: str
             })
         
         email_date = result[1]
-        reply = generate_email_reply(subject, original_body, custom_prompt=custom_prompt) if custom_prompt else generate_email_reply(subject, original_body)
+        body_html, body_text = hydrate_email_body(message_id)
+        body_text = body_text if body_text is not None else to_plain_text(original_body)
+        reply = generate_email_reply(subject, body_text, custom_prompt=custom_prompt or None, force=regenerate)
         if not reply:
             return templates.TemplateResponse("email_view.html", {
                 "request": request,
@@ -379,7 +550,7 @@ async def generate_reply(request: Request, sender: str = Form(...), subject: str
                 "message_type": "error"
             })
         
-        draft_id = create_draft(sender, f"Re: {subject}", reply)
+        draft_id = create_draft(sender, reply_subject(subject), reply, load_reply_thread(message_id))
         if not draft_id:
             return templates.TemplateResponse("email_view.html", {
                 "request": request,
@@ -389,7 +560,7 @@ async def generate_reply(request: Request, sender: str = Form(...), subject: str
             })
         
         update_email_reply(sender, subject, reply, draft_id, email_date)
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         c.execute("UPDATE replied_emails SET status='draft', draft_id=? WHERE message_id=?", (draft_id, message_id))
         conn.commit()
@@ -405,6 +576,94 @@ async def generate_reply(request: Request, sender: str = Form(...), subject: str
             "message_type": "error"
         })
 
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+# Yield server-sent events for a reply as Gemini streams it: unnamed events carry text,
+# then "done" carries the full reply, or "failed" carries the error
+def stream_reply_events(message_id, subject, custom_prompt=None, force=False):
+    try:
+        body_text = hydrate_email_body(message_id)[1] or ''
+        key = reply_key(subject, body_text, custom_prompt)
+        reply = None if force else reply_cache.get(key)
+        if reply:
+            yield sse_event({"text": reply})
+        else:
+            prompt = custom_prompt if custom_prompt else build_prompt(REPLY_PROMPT_TEMPLATE, subject, body_text)[0]
+            parts = []
+            for text in stream_text(prompt):
+                parts.append(text)
+                yield sse_event({"text": text})
+            reply = ''.join(parts).strip()
+            suffix = signature_suffix(reply)
+            if suffix:
+                yield sse_event({"text": suffix})
+                reply += suffix
+            reply_cache.put(key, reply, Config.GEMINI_MODEL)
+            logger.info(f"✅ Streamed AI reply for {message_id}")
+
+        # Kept on the row so a reload shows it; no draft exists until the reply is accepted
+        conn = db.connect()
+        with conn:
+            conn.execute(
+                "UPDATE replied_emails SET suggested_reply=?, suggestion_status='ready', suggested_at=? WHERE message_id=?",
+                (reply, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), message_id)
+            )
+        conn.close()
+        yield sse_event({"reply": reply}, event="done")
+    except Exception as e:
+        logger.error(f"⚠️ Error streaming reply for {message_id}: {e}")
+        yield sse_event({"message": f"Failed to generate reply: {e}"}, event="failed")
+
+# Stream a reply into the email view over server-sent events
+@app.get("/generate_reply_stream/{message_id}")
+async def generate_reply_stream(message_id: str, custom_prompt: str = None, regenerate: bool = False):
+    conn = db.connect()
+    c = conn.cursor()
+    c.execute("SELECT subject, status FROM replied_emails WHERE message_id=?", (message_id,))
+    row = c.fetchone()
+    conn.close()
+    if not row or row[1] in ['no-reply', 'sent']:
+        events = iter([sse_event({"message": "Reply cannot be generated for this email."}, event="failed")])
+    else:
+        events = stream_reply_events(message_id, row[0] or 'No Subject', custom_prompt or None, regenerate)
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Create the Gmail draft for a reviewed (streamed or edited) reply
+@app.post("/accept_reply", response_class=HTMLResponse)
+async def accept_reply(request: Request, message_id: str = Form(...), reply: str = Form(...)):
+    try:
+        conn = db.connect()
+        c = conn.cursor()
+        c.execute("SELECT sender, subject, email_date, status FROM replied_emails WHERE message_id=?", (message_id,))
+        row = c.fetchone()
+        conn.close()
+        if not row or row[3] in ['no-reply', 'sent']:
+            return templates.TemplateResponse("email_view.html", {"request": request, "message": "Reply cannot be saved for this email.", "message_type": "error"})
+
+        sender, subject, email_date, _ = row
+        reply = sanitize_text(reply)
+        draft_id = create_draft(sender, reply_subject(subject), reply, load_reply_thread(message_id))
+        if not draft_id:
+            return templates.TemplateResponse("email_view.html", {
+                "request": request,
+                "email": {"sender": sender, "subject": subject, "message_id": message_id, "reply": reply},
+                "message": "Failed to create draft. Please check authentication.",
+                "message_type": "error"
+            })
+
+        update_email_reply(sender, subject, reply, draft_id, email_date)
+        conn = db.connect()
+        c = conn.cursor()
+        c.execute("UPDATE replied_emails SET status='draft', draft_id=? WHERE message_id=?", (draft_id, message_id))
+        conn.commit()
+        conn.close()
+        return RedirectResponse(url=f"/view/{message_id}", status_code=303)
+    except Exception as e:
+        logger.error(f"⚠️ Error accepting reply for {message_id}: {e}")
+        return templates.TemplateResponse("email_view.html", {"request": request, "message": f"Failed to save reply: {str(e)}.", "message_type": "error"})
+
 # Upload CSV endpoint with improved error handling
 @app.post("/upload_csv", response_class=HTMLResponse)
 async def upload_csv(request: Request, file: UploadFile = File(...)):
@@ -445,16 +704,17 @@ async def upload_csv(request: Request, file: UploadFile = File(...)):
             })
 
         # Insert data into database
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         inserted_count = 0
         for row in csv_reader:
             try:
                 # Generate unique message_id for CSV entries
                 message_id = f"csv_{inserted_count}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                body_html, body_text, preview = prepare_body(row['original_body'])
                 c.execute(
-                    "INSERT INTO replied_emails (sender, subject, email_date, status, original_body, message_id) VALUES (?, ?, ?, ?, ?, ?)",
-                    (row['sender'], row['subject'], datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'unread', row['original_body'], message_id)
+                    "INSERT INTO replied_emails (sender, subject, email_date, status, original_body, body_text, preview, message_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row['sender'], row['subject'], datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'unread', body_html, body_text, preview, message_id)
                 )
                 inserted_count += 1
             except KeyError as e:
@@ -485,16 +745,23 @@ async def upload_csv(request: Request, file: UploadFile = File(...)):
 
 # View emails for bulk actions
 @app.get("/bulk", response_class=HTMLResponse)
-async def bulk_page(request: Request):
+async def bulk_page(request: Request, job_id: str = None):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
-        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id FROM replied_emails WHERE status IN ('unread', 'draft') ORDER BY email_date DESC")
+        c.execute("SELECT sender, subject, email_date, status, reply, preview, draft_id, message_id, COALESCE(body_text, preview) FROM replied_emails WHERE status IN ('unread', 'draft') ORDER BY email_date DESC")
         rows = c.fetchall()
         conn.close()
-        emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id'], row)) for row in rows]
-        logger.info(f"✅ Fetched {len(emails)} emails for bulk action")
-        return templates.TemplateResponse("bulk.html", {"request": request, "emails": emails})
+        emails = [dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'preview', 'draft_id', 'message_id'], row)) for row in rows]
+
+        # Show how many near-duplicates each email has; those share one AI reply in bulk send
+        clusters = cluster_texts([(row[7], similarity_text(normalize_subject(row[1]), clean_body(row[8]))) for row in rows])
+        sizes = cluster_sizes(clusters)
+        for email in emails:
+            email['cluster_size'] = sizes.get(email['message_id'], 1)
+        logger.info(f"✅ Fetched {len(emails)} emails for bulk action ({len(clusters)} clusters)")
+        job = get_bulk_job(job_id) if job_id else None
+        return templates.TemplateResponse("bulk.html", {"request": request, "emails": emails, "cluster_count": len(clusters), "job": job})
     except Exception as e:
         logger.error(f"⚠️ Error fetching emails for bulk: {e}")
         return templates.TemplateResponse("bulk.html", {"request": request, "emails": [], "message": f"Failed to fetch emails: {str(e)}", "message_type": "error"})
@@ -503,20 +770,144 @@ async def bulk_page(request: Request):
 @app.get("/view/{message_id}", response_class=HTMLResponse)
 async def view_email(request: Request, message_id: str):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
-        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id FROM replied_emails WHERE message_id=?", (message_id,))
+        c.execute("SELECT sender, subject, email_date, status, reply, original_body, draft_id, message_id, suggested_reply FROM replied_emails WHERE message_id=?", (message_id,))
         row = c.fetchone()
         conn.close()
         if not row:
             return templates.TemplateResponse("email_view.html", {"request": request, "message": "Email not found.", "message_type": "error"})
-        email = dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id'], row))
+        email = dict(zip(['sender', 'subject', 'email_date', 'status', 'reply', 'original_body', 'draft_id', 'message_id', 'suggested_reply'], row))
+        email['original_body'] = hydrate_email_body(message_id)[0] or email['original_body']
         return templates.TemplateResponse("email_view.html", {"request": request, "email": email})
     except Exception as e:
         logger.error(f"⚠️ Error viewing email {message_id}: {e}")
         return templates.TemplateResponse("email_view.html", {"request": request, "message": f"Failed to view email: {str(e)}", "message_type": "error"})
 
-# Bulk send emails
+# Bulk job step 1: generate the AI replies a job still needs; returns {position: reply}
+def prepare_bulk_replies(job, items):
+    bodies = hydrate_email_bodies([item['message_id'] for item in items])
+    conn = db.connect()
+    try:
+        for item in items:
+            body = bodies.get(item['message_id'])
+            if body:
+                item['body_text'] = body[1]
+            else:
+                row = conn.execute("SELECT original_body FROM replied_emails WHERE message_id=?", (item['message_id'],)).fetchone()
+                item['body_text'] = to_plain_text(row[0]) if row else ''
+    finally:
+        conn.close()
+
+    # Near-duplicate emails share one generated reply, personalized with each sender's name
+    clusters = cluster_texts([
+        (index, similarity_text(normalize_subject(item['email_subject']), clean_body(item['body_text']))) for index, item in enumerate(items)
+    ])
+    representatives = [items[cluster[0]] for cluster in clusters]
+    logger.info(f"🧩 {len(items)} emails in {len(clusters)} clusters, saving {len(items) - len(clusters)} Gemini calls")
+
+    replies = generate_replies(
+        generate_email_reply,
+        [(item['email_subject'] or 'No Subject', item['body_text'], job['custom_prompt'] or None) for item in representatives]
+    )
+    prepared = {}
+    for cluster, representative, reply in zip(clusters, representatives, replies):
+        for index in cluster:
+            prepared[items[index]['position']] = personalize_reply(reply, representative['sender'], items[index]['sender'])
+    return prepared
+
+# Bulk job step 2: record how the item will go out, before it is sent
+# A stored draft is one a human reviewed, so it is sent as is; otherwise the reply goes out directly with
+# messages.send (one API call). BULK_SEND_MODE=draft creates a draft first so every reply is visible in Gmail.
+def stage_bulk_item(job, item):
+    draft_id = normalize_draft_id(item['draft_id'])
+    if not draft_id and Config.BULK_SEND_MODE == 'draft':
+        draft_id = create_draft(item['sender'], job['subject'], item['reply'], load_reply_thread(item['message_id']))
+        if not draft_id:
+            raise Exception("Failed to create draft")
+        update_draft_id_in_db(item['sender'], item['email_subject'], draft_id, item['email_date'])
+    update_email_reply(item['sender'], item['email_subject'], item['reply'], draft_id, item['email_date'])
+    # The Message-ID is fixed before sending so an interrupted direct send can be looked up after a restart
+    return {"draft_id": draft_id, "outgoing_message_id": new_message_id()}
+
+def mark_email_sent(message_id):
+    conn = db.connect()
+    try:
+        with conn:
+            conn.execute("UPDATE replied_emails SET status='sent', reply_date=? WHERE message_id=?",
+                         (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), message_id))
+    finally:
+        conn.close()
+
+# Bulk job step 3: send the draft, or the reply itself when there is no draft or it was deleted in Gmail
+def deliver_bulk_item(job, item):
+    thread = load_reply_thread(item['message_id'])
+    if item['draft_id']:
+        service = get_gmail_service()
+        if not service:
+            raise Exception("Failed to initialize Gmail service")
+        try:
+            send_draft(service, item['draft_id'])
+            mark_email_sent(item['message_id'])
+            return
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            live_drafts.discard(item['draft_id'])
+            logger.warning(f"⚠️ Draft {item['draft_id']} no longer exists, sending the reply directly")
+    send_message(item['sender'], job['subject'], item['reply'], thread, message_id=item['outgoing_message_id'])
+    mark_email_sent(item['message_id'])
+
+# After a restart, an item caught mid-send went out if its Message-ID is in the mailbox,
+# or if its draft is gone (drafts.send deletes it)
+def settle_interrupted_item(item):
+    if item['outgoing_message_id'] and message_exists(item['outgoing_message_id']):
+        delivered = True
+    else:
+        delivered = bool(item['draft_id']) and not verify_draft(item['draft_id'])
+    if delivered:
+        mark_email_sent(item['message_id'])
+    return delivered
+
+bulk_scheduler = BulkSendScheduler(prepare_bulk_replies, stage_bulk_item, deliver_bulk_item, settle_interrupted_item)
+
+# Count the last day's sends against the daily budget, so a restart doesn't reset it
+@app.on_event("startup")
+def seed_send_budget():
+    try:
+        since = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+        conn = db.connect()
+        rows = conn.execute("SELECT reply_date FROM replied_emails WHERE status='sent' AND reply_date >= ?", (since,)).fetchall()
+        conn.close()
+        send_limiter.seed([datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp() for row in rows if row[0]])
+    except Exception as e:
+        logger.error(f"⚠️ Error seeding send budget: {e}")
+
+@app.get("/send_rate")
+async def send_rate():
+    return send_limiter.snapshot()
+
+@app.on_event("startup")
+def start_bulk_scheduler():
+    bulk_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_bulk_scheduler():
+    bulk_scheduler.stop()
+
+# Check the selected emails' draft ids with one drafts.list pass; stale ids are cleared in the database
+# and on the emails, so the job never stages a draft that no longer exists
+def reconcile_selected_drafts(service, emails):
+    live_ids = live_drafts.ids(service)
+    conn = db.connect()
+    try:
+        reconciled = reconcile_draft_ids(conn, [(email['message_id'], email['draft_id']) for email in emails], live_ids)
+    finally:
+        conn.close()
+    for email in emails:
+        email['draft_id'] = reconciled[email['message_id']]
+
+# Queue a bulk send as a background job and return at once; progress is at /bulk_jobs/{job_id}
 @app.post("/bulk_send", response_class=HTMLResponse)
 async def bulk_send(request: Request, subject: str = Form(default='No Subject'), message: str = Form(default=''), selected_emails: list = Form(...), use_ai_reply: bool = Form(default=False), custom_prompt: str = Form(default=None)):
     try:
@@ -535,14 +926,14 @@ async def bulk_send(request: Request, subject: str = Form(default='No Subject'),
                 "message_type": "error"
             })
 
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         emails = []
         for message_id in selected_emails:
-            c.execute("SELECT sender, subject, draft_id, message_id, original_body, email_date FROM replied_emails WHERE message_id=?", (message_id,))
+            c.execute("SELECT sender, subject, draft_id, message_id, email_date FROM replied_emails WHERE message_id=?", (message_id,))
             row = c.fetchone()
             if row:
-                emails.append({"sender": row[0], "subject": row[1] or 'No Subject', "draft_id": row[2], "message_id": row[3], "original_body": row[4], "email_date": row[5]})
+                emails.append({"sender": row[0], "subject": row[1] or 'No Subject', "draft_id": row[2], "message_id": row[3], "email_date": row[4]})
         conn.close()
 
         if not emails:
@@ -561,52 +952,29 @@ async def bulk_send(request: Request, subject: str = Form(default='No Subject'),
                 "message": "Failed to initialize Gmail service.",
                 "message_type": "error"
             })
+        await asyncio.to_thread(reconcile_selected_drafts, service, emails)
 
-        conn = sqlite3.connect("replied_emails.db")
-        c = conn.cursor()
-        sent_count = 0
-        failed_emails = []
-        for email in emails:
+        # A typed message is sanitized and compiled once, then rendered per recipient from their row
+        if not use_ai_reply:
             try:
-                message_text = None
-                if use_ai_reply:
-                    message_text = generate_email_reply(email['subject'], email['original_body'], custom_prompt=custom_prompt) if custom_prompt else generate_email_reply(email['subject'], email['original_body'])
-                else:
-                    message_text = sanitize_text(message)
-                
-                if not message_text:
-                    failed_emails.append(email['sender'])
-                    continue
-                
-                draft_id = email['draft_id']
-                if draft_id == "None" or not verify_draft(draft_id):
-                    new_draft_id = create_draft(email['sender'], subject, message_text)
-                    if not new_draft_id:
-                        failed_emails.append(email['sender'])
-                        continue
-                    update_draft_id_in_db(email['sender'], email['subject'], new_draft_id, email['email_date'])
-                    draft_id = new_draft_id
-
-                update_email_reply(email['sender'], email['subject'], message_text, draft_id, email['email_date'])
-                await send_email_with_delay(service, draft_id, delay=10)
-
-                c.execute("UPDATE replied_emails SET status='sent', reply_date=? WHERE message_id=?", 
-                         (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), email['message_id']))
-                conn.commit()
-                sent_count += 1
-            except Exception as e:
-                logger.error(f"⚠️ Error processing email for {email['sender']}: {e}")
-                failed_emails.append(email['sender'])
+                template = BulkTemplate(message)
+            except TemplateError as e:
+                return templates.TemplateResponse("bulk.html", {
+                    "request": request,
+                    "emails": (await bulk_page(request)).body,
+                    "message": str(e),
+                    "message_type": "error"
+                })
+            for email in emails:
+                email['reply'] = template.render(template_values(email['sender'], email['subject'], email['email_date']))
 
-        conn.close()
-        if failed_emails:
-            return templates.TemplateResponse("bulk.html", {
-                "request": request,
-                "emails": (await bulk_page(request)).body,
-                "message": f"Sent {sent_count} emails successfully. Failed for {len(failed_emails)}: {', '.join(failed_emails)}",
-                "message_type": "error"
-            })
-        return RedirectResponse(url="/bulk", status_code=303)
+        job_id = create_bulk_job(
+            emails, subject,
+            use_ai_reply=use_ai_reply,
+            custom_prompt=custom_prompt or None
+        )
+        bulk_scheduler.wake()
+        return RedirectResponse(url=f"/bulk?job_id={job_id}", status_code=303)
     except Exception as e:
         logger.error(f"⚠️ Error during bulk send: {e}")
         return templates.TemplateResponse("bulk.html", {
@@ -616,11 +984,32 @@ async def bulk_send(request: Request, subject: str = Form(default='No Subject'),
             "message_type": "error"
         })
 
+@app.get("/bulk_jobs")
+async def bulk_jobs():
+    return list_bulk_jobs()
+
+@app.get("/bulk_jobs/{job_id}")
+async def bulk_job_status(job_id: str, items: bool = False):
+    job = get_bulk_job(job_id, include_items=items)
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    finish = bulk_scheduler.projected_completion(job_id)
+    job['projected_completion'] = datetime.fromtimestamp(finish).strftime("%Y-%m-%d %H:%M:%S") if finish else None
+    return job
+
+# Emails not yet sent are cancelled; the one being sent, if any, still goes out
+@app.post("/bulk_jobs/{job_id}/cancel")
+async def bulk_job_cancel(job_id: str):
+    if not cancel_bulk_job(job_id):
+        raise HTTPException(status_code=404, detail="No running bulk job with that id")
+    bulk_scheduler.wake()
+    return get_bulk_job(job_id)
+
 # Delete specific email
 @app.post("/delete_email", response_class=RedirectResponse)
 async def delete_email(request: Request, message_id: str = Form(...)):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         # Debug: Log the message_id being deleted
         logger.info(f"Attempting to delete email with message_id: {message_id}")
@@ -651,7 +1040,7 @@ async def delete_email(request: Request, message_id: str = Form(...)):
 @app.post("/delete_all_emails", response_class=RedirectResponse)
 async def delete_all_emails(request: Request, category: str = Form(default="all")):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         if category == "all":
             c.execute("DELETE FROM replied_emails")
@@ -675,7 +1064,7 @@ async def delete_all_emails(request: Request, category: str = Form(default="all"
 @app.post("/delete_selected_emails", response_class=RedirectResponse)
 async def delete_selected_emails(request: Request, selected_emails: list = Form(...)):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         deleted_count = 0
         for message_id in selected_emails:
@@ -702,33 +1091,33 @@ async def delete_selected_emails(request: Request, selected_emails: list = Form(
 async def send_reply(request: Request, sender: str = Form(...), subject: str = Form(...), reply: str = Form(...), message_id: str = Form(...)):
     try:
         reply = sanitize_text(reply)
-        draft_id = create_draft(sender, f"Re: {subject}", reply)
-        if not draft_id:
-            return templates.TemplateResponse("email_view.html", {
-                "request": request,
-                "email": {"sender": sender, "subject": subject, "message_id": message_id},
-                "message": "Failed to create draft.", "message_type": "error"
-            })
-        
-        service = get_gmail_service()
-        if not service:
+
+        # Takes a slot from the same send budget as bulk jobs; an exhausted budget is reported, not waited out
+        domain = recipient_domain(sender)
+        wait = send_limiter.reserve(domain)
+        if 0 < wait <= MAX_INLINE_SEND_WAIT:
+            await asyncio.sleep(wait)
+            wait = send_limiter.reserve(domain)
+        if wait > 0:
+            available_at = (datetime.now() + timedelta(seconds=wait)).strftime("%H:%M:%S")
             return templates.TemplateResponse("email_view.html", {
                 "request": request,
-                "email": {"sender": sender, "subject": subject, "message_id": message_id},
-                "message": "Failed to initialize Gmail service.", "message_type": "error"
+                "email": {"sender": sender, "subject": subject, "message_id": message_id, "reply": reply},
+                "message": f"Sending limit reached. Try again after {available_at}.", "message_type": "error"
             })
-        
-        conn = sqlite3.connect("replied_emails.db")
+
+        # Sent straight away with messages.send; a draft is only needed for review
+        await asyncio.to_thread(send_message, sender, reply_subject(subject), reply, load_reply_thread(message_id))
+
+        conn = db.connect()
         c = conn.cursor()
         c.execute("SELECT email_date FROM replied_emails WHERE message_id=?", (message_id,))
         email_date = c.fetchone()[0]
-        update_email_reply(sender, subject, reply, draft_id, email_date)
+        update_email_reply(sender, subject, reply, None, email_date)
         c.execute("UPDATE replied_emails SET status='sent', reply_date=? WHERE message_id=?", 
                  (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), message_id))
         conn.commit()
         conn.close()
-        
-        await send_email_with_delay(service, draft_id, delay=10)
         return RedirectResponse(url="/", status_code=303)
     except Exception as e:
         logger.error(f"⚠️ Error sending reply for {subject}: {e}")
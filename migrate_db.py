@@ -1,12 +1,13 @@
 import sqlite3
 import logging
+import db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def migrate_db():
     try:
-        conn = sqlite3.connect('replied_emails.db')
+        conn = db.connect()
         c = conn.cursor()
 
         # Check if columns exist
@@ -23,6 +24,47 @@ def migrate_db():
             c.execute('ALTER TABLE replied_emails ADD COLUMN message_id TEXT')
             logger.info("✅ Added message_id column")
 
+        # Add preview if missing
+        if 'preview' not in columns:
+            c.execute('ALTER TABLE replied_emails ADD COLUMN preview TEXT')
+            logger.info("✅ Added preview column")
+
+        # Add body_text if missing; filled in for older rows the first time their body is read
+        if 'body_text' not in columns:
+            c.execute('ALTER TABLE replied_emails ADD COLUMN body_text TEXT')
+            logger.info("✅ Added body_text column")
+
+        # Add body_fetched if missing; rows stored before lazy loading already hold their body
+        if 'body_fetched' not in columns:
+            c.execute('ALTER TABLE replied_emails ADD COLUMN body_fetched INTEGER DEFAULT 1')
+            logger.info("✅ Added body_fetched column")
+
+        # Add body_truncated if missing
+        if 'body_truncated' not in columns:
+            c.execute('ALTER TABLE replied_emails ADD COLUMN body_truncated INTEGER DEFAULT 0')
+            logger.info("✅ Added body_truncated column")
+
+        # Add pre-generated reply suggestion columns if missing
+        for column, column_type in (('suggested_reply', 'TEXT'), ('suggestion_status', 'TEXT'), ('suggested_at', 'DATETIME')):
+            if column not in columns:
+                c.execute(f'ALTER TABLE replied_emails ADD COLUMN {column} {column_type}')
+                logger.info(f"✅ Added {column} column")
+
+        # Add Gmail threading columns if missing; replies use them to land in the original thread
+        for column in ('thread_id', 'header_message_id', 'header_references'):
+            if column not in columns:
+                c.execute(f'ALTER TABLE replied_emails ADD COLUMN {column} TEXT')
+                logger.info(f"✅ Added {column} column")
+
+        # Older code stored a missing draft id as the string "None"
+        c.execute("UPDATE replied_emails SET draft_id=NULL WHERE draft_id IN ('None', '')")
+
+        # Ingest relies on message_id being unique to skip emails it already stored
+        try:
+            c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_replied_emails_message_id ON replied_emails (message_id)')
+        except sqlite3.IntegrityError as e:
+            logger.warning(f"⚠️ Could not add unique message_id index, duplicate rows exist: {e}")
+
         conn.commit()
     except Exception as e:
         logger.error(f"⚠️ Error migrating database: {e}")
@@ -0,0 +1,81 @@
+import base64
+import codecs
+import logging
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# base64 characters decoded per step; a multiple of 4 so every chunk decodes on its own
+DECODE_CHUNK_CHARS = 64 * 1024
+
+# Parts with a filename or an attachmentId are attachments; their payloads are never decoded
+def is_attachment(part):
+    body = part.get('body', {})
+    return bool(part.get('filename')) or 'attachmentId' in body
+
+# Charset from a part's Content-Type header, defaulting to UTF-8
+def part_charset(part):
+    for header in part.get('headers', []):
+        if header['name'].lower() == 'content-type':
+            for param in header['value'].split(';')[1:]:
+                key, _, value = param.strip().partition('=')
+                if key.lower() == 'charset' and value:
+                    return value.strip('"\'')
+    return 'utf-8'
+
+# Depth-first walk over the MIME tree, yielding leaf parts that carry inline body data
+def iter_body_parts(payload):
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if is_attachment(part):
+            continue
+        children = part.get('parts')
+        if children:
+            stack.extend(reversed(children))
+        elif part.get('body', {}).get('data'):
+            yield part
+
+# Decode base64url data chunk by chunk, stopping once max_bytes of decoded output is reached
+# Returns (text, truncated)
+def decode_part(data, charset='utf-8', max_bytes=None):
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    pieces = []
+    decoded_bytes = 0
+    for start in range(0, len(data), DECODE_CHUNK_CHARS):
+        chunk = data[start:start + DECODE_CHUNK_CHARS]
+        raw = base64.urlsafe_b64decode(chunk + '=' * (-len(chunk) % 4))
+        if max_bytes and decoded_bytes + len(raw) > max_bytes:
+            # Not final: a multi-byte character cut by the cap is dropped rather than replaced
+            pieces.append(decoder.decode(raw[:max_bytes - decoded_bytes]))
+            return ''.join(pieces), True
+        decoded_bytes += len(raw)
+        pieces.append(decoder.decode(raw))
+    pieces.append(decoder.decode(b'', final=True))
+    return ''.join(pieces), False
+
+# Pick the preferred body from a Gmail message payload and decode it up to max_bytes
+# Returns (body, mime_type, truncated); body is "" when no inline text part exists
+def extract_body(payload, preferred=('text/html', 'text/plain'), max_bytes=None):
+    max_bytes = Config.MAX_BODY_BYTES if max_bytes is None else max_bytes
+    candidates = {}
+    for part in iter_body_parts(payload):
+        mime_type = part.get('mimeType', '').lower()
+        if mime_type in preferred and mime_type not in candidates:
+            candidates[mime_type] = part
+            if mime_type == preferred[0]:
+                break
+
+    for mime_type in preferred:
+        part = candidates.get(mime_type)
+        if part:
+            body, truncated = decode_part(part['body']['data'], part_charset(part), max_bytes)
+            if truncated:
+                logger.warning(f"⚠️ Email body truncated at {max_bytes} bytes")
+            return body, mime_type, truncated
+    return "", None, False
@@ -0,0 +1,175 @@
+from collections import deque
+from datetime import datetime
+import logging
+import queue
+import threading
+import time
+import db
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Generates replies for unread emails ahead of time and stores them as suggestions on the row
+# generate_fn(subject, body_text) returns a reply or raises; load_bodies_fn(ids) returns {id: (html, text)}
+class PregenWorker:
+    def __init__(self, generate_fn, load_bodies_fn, db_path="replied_emails.db", concurrency=None, hourly_budget=None, scan_interval=None):
+        self.generate_fn = generate_fn
+        self.load_bodies_fn = load_bodies_fn
+        self.db_path = db_path
+        self.concurrency = max(1, concurrency or Config.PREGEN_CONCURRENCY)
+        self.hourly_budget = Config.PREGEN_HOURLY_BUDGET if hourly_budget is None else hourly_budget
+        self.scan_interval = scan_interval or Config.PREGEN_SCAN_INTERVAL
+        self.queue = queue.Queue()
+        self._queued = set()  # message ids waiting or in progress, so a rescan doesn't add them twice
+        self._spent = deque()  # start times of generations in the last hour
+        self._lock = threading.Lock()
+        self._resumed = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self.generated = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            self._resumed.set()
+            self._threads = [threading.Thread(target=self._scan_loop, name="pregen-scan", daemon=True)]
+            self._threads += [
+                threading.Thread(target=self._work_loop, name=f"pregen-{i}", daemon=True) for i in range(self.concurrency)
+            ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"🚀 Reply pre-generation started ({self.concurrency} workers, {self.hourly_budget}/hour)")
+
+    # Emails already being generated finish; nothing new is picked up until resume()
+    def pause(self):
+        self._resumed.clear()
+        logger.info("⏸️ Reply pre-generation paused")
+
+    def resume(self):
+        if not self._threads:
+            self.start()
+            return
+        self._resumed.set()
+        logger.info("▶️ Reply pre-generation resumed")
+
+    def stop(self):
+        self._stopping.set()
+        self._resumed.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    # Budget left in the rolling hour (caller holds _lock)
+    def _remaining_budget(self):
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+        return max(0, self.hourly_budget - len(self._spent))
+
+    # Queue unread emails without a suggestion, up to what the budget can still cover
+    def scan(self):
+        if not self._resumed.is_set():
+            return 0
+        with self._lock:
+            queued = len(self._queued)
+            room = self._remaining_budget() - queued
+        if room <= 0:
+            return 0
+        conn = db.connect(self.db_path)
+        try:
+            # Over-fetch by the number already queued, since those rows still match
+            rows = conn.execute('''
+                SELECT message_id, subject FROM replied_emails
+                WHERE status='unread' AND suggestion_status IS NULL AND message_id IS NOT NULL
+                ORDER BY email_date DESC LIMIT ?
+            ''', (room + queued,)).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            rows = [row for row in rows if row[0] not in self._queued][:room]
+            for message_id, subject in rows:
+                self._queued.add(message_id)
+                self.queue.put((message_id, subject))
+        if rows:
+            logger.info(f"📥 Queued {len(rows)} emails for reply pre-generation")
+        return len(rows)
+
+    def _scan_loop(self):
+        while not self._stopping.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"⚠️ Pre-generation scan failed: {e}")
+            self._stopping.wait(self.scan_interval)
+
+    def _work_loop(self):
+        while not self._stopping.is_set():
+            self._resumed.wait()
+            try:
+                message_id, subject = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.process(message_id, subject)
+            except Exception as e:
+                logger.error(f"⚠️ Pre-generation worker error for {message_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    # Generate and store one suggestion; returns True if one was stored
+    def process(self, message_id, subject):
+        try:
+            with self._lock:
+                if self._remaining_budget() <= 0:
+                    return False  # left unmarked, so a later scan picks it up again
+                self._spent.append(time.monotonic())
+
+            body_text = (self.load_bodies_fn([message_id]).get(message_id) or (None, ''))[1]
+            reply = self.generate_fn(subject or 'No Subject', body_text or '')
+            stored = self._store(message_id, reply, 'ready')
+            with self._lock:
+                self.generated += 1
+            logger.info(f"✅ Pre-generated reply for {message_id}")
+            return stored
+        except Exception as e:
+            logger.error(f"⚠️ Pre-generation failed for {message_id}: {e}")
+            with self._lock:
+                self.failed += 1
+            self._store(message_id, None, 'failed')
+            return False
+        finally:
+            with self._lock:
+                self._queued.discard(message_id)
+
+    # Only rows still unread get the suggestion; anything replied to in the meantime is left alone
+    def _store(self, message_id, reply, suggestion_status):
+        conn = db.connect(self.db_path)
+        try:
+            with conn:
+                cursor = conn.execute('''
+                    UPDATE replied_emails SET suggested_reply=?, suggestion_status=?, suggested_at=?
+                    WHERE message_id=? AND status='unread'
+                ''', (reply, suggestion_status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), message_id))
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def status(self):
+        with self._lock:
+            if not self._threads:
+                state = "stopped"
+            else:
+                state = "running" if self._resumed.is_set() else "paused"
+            return {
+                "state": state,
+                "queued": len(self._queued),
+                "concurrency": self.concurrency,
+                "hourly_budget": self.hourly_budget,
+                "budget_remaining": self._remaining_budget(),
+                "generated": self.generated,
+                "failed": self.failed
+            }
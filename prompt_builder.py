@@ -0,0 +1,126 @@
+import logging
+import math
+import re
+import threading
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rough Gemini token size for English text; close enough for budgeting without a count_tokens round trip
+CHARS_PER_TOKEN = 4
+
+# Everything after these lines is an earlier message in the thread
+# Gmail often wraps the "On <date>, <name> wrote:" line once, so allow one line break
+REPLY_HEADER_RE = re.compile(r'^[ \t]*On\b[^\n]{0,200}(\n[^\n]{0,200})?\bwrote:[ \t]*$', re.IGNORECASE | re.MULTILINE)
+ORIGINAL_MESSAGE_RE = re.compile(r'^[ \t]*-{2,}\s*Original Message\s*-{2,}\s*$', re.IGNORECASE | re.MULTILINE)
+OUTLOOK_HEADER_RE = re.compile(r'^[ \t]*From:.*\n[ \t]*(Sent|Date):.*\n([ \t]*(To|Cc|Subject):.*\n)*', re.IGNORECASE | re.MULTILINE)
+FORWARDED_RE = re.compile(r'^[ \t]*-{2,}\s*Forwarded message\s*-{2,}\s*$', re.IGNORECASE | re.MULTILINE)
+FORWARD_HEADER_LINE_RE = re.compile(r'^\s*(From|Date|Sent|Subject|To|Cc):.*$', re.IGNORECASE)
+
+# Signature and boilerplate markers; only honoured in the last part of the body
+SIGNATURE_RE = re.compile(
+    r'^[ \t]*(--[ \t]*|_{3,}|Sent from my .*|Get Outlook for .*|'
+    r'(CONFIDENTIALITY NOTICE|DISCLAIMER|This (e-?mail|message) (and any attachments )?(is|are|may be) confidential).*)$',
+    re.IGNORECASE | re.MULTILINE
+)
+SIGNATURE_TAIL_FRACTION = 0.4
+SIGNATURE_TAIL_LINES = 12
+
+# Share of the truncated body kept from the start; the rest comes from the end
+HEAD_FRACTION = 0.6
+
+def estimate_tokens(text):
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+# Drop "On ... wrote:" history, "> " quoted lines, original-message blocks and forwarded headers
+def strip_quoted_history(text):
+    forwarded = FORWARDED_RE.search(text)
+    if forwarded:
+        if text[:forwarded.start()].strip():
+            text = text[:forwarded.start()]
+        else:
+            # A bare forward: the forwarded message is the content, only its header block goes
+            body_lines = text[forwarded.end():].lstrip('\n').split('\n')
+            while body_lines and (FORWARD_HEADER_LINE_RE.match(body_lines[0]) or not body_lines[0].strip()):
+                body_lines.pop(0)
+            text = '\n'.join(body_lines)
+
+    cut = len(text)
+    for pattern in (REPLY_HEADER_RE, ORIGINAL_MESSAGE_RE, OUTLOOK_HEADER_RE):
+        match = pattern.search(text)
+        # A marker on the first line means the whole email is quoted; keep it rather than sending nothing
+        if match and text[:match.start()].strip():
+            cut = min(cut, match.start())
+    text = text[:cut]
+
+    lines = [line for line in text.split('\n') if not line.lstrip().startswith('>')]
+    return '\n'.join(lines).strip()
+
+# Drop a trailing signature or disclaimer, looking only at the last part of the body
+def strip_signature(text):
+    tail_start = int(len(text) * (1 - SIGNATURE_TAIL_FRACTION))
+    # Short emails are mostly signature, so always look at the last few lines too
+    lines = text.split('\n')
+    tail_start = min(tail_start, len('\n'.join(lines[:-SIGNATURE_TAIL_LINES])) if len(lines) > SIGNATURE_TAIL_LINES else 0)
+    match = SIGNATURE_RE.search(text, tail_start)
+    if match and text[:match.start()].strip():
+        return text[:match.start()].rstrip()
+    return text
+
+# Keep the head and tail of text within max_tokens, marking what was cut from the middle
+def truncate_middle(text, max_tokens):
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text, False
+    marker = f"\n\n[... {len(text) - max_chars} characters omitted ...]\n\n"
+    keep = max(0, max_chars - len(marker))
+    head = int(keep * HEAD_FRACTION)
+    tail = keep - head
+    return text[:head].rstrip() + marker + (text[-tail:].lstrip() if tail else ''), True
+
+# Body with quoted history and signature removed
+def clean_body(body_text):
+    return strip_signature(strip_quoted_history(body_text or ''))
+
+# Fill template with subject and the cleaned body, truncating the body so the prompt stays within max_tokens
+# Returns (prompt, stats)
+def build_prompt(template, subject, body_text, max_tokens=None, body_field='body_text'):
+    max_tokens = max_tokens or Config.PROMPT_MAX_TOKENS
+    cleaned = clean_body(body_text)
+    overhead = estimate_tokens(template.format(**{'subject': subject, body_field: ''}))
+    body, truncated = truncate_middle(cleaned, max_tokens - overhead)
+    prompt = template.format(**{'subject': subject, body_field: body})
+
+    original_tokens = overhead + estimate_tokens(body_text)
+    stats = {
+        "original_tokens": original_tokens,
+        "cleaned_tokens": overhead + estimate_tokens(cleaned),
+        "prompt_tokens": estimate_tokens(prompt),
+        "truncated": truncated
+    }
+    stats["saved_tokens"] = max(0, original_tokens - stats["prompt_tokens"])
+    record_prompt_stats(stats)
+    logger.info(
+        f"🧾 Prompt for '{subject}': {stats['prompt_tokens']} tokens "
+        f"(was {original_tokens}, saved {stats['saved_tokens']}{', truncated' if truncated else ''})"
+    )
+    return prompt, stats
+
+# Running totals since startup, for the /prompt_stats endpoint
+_totals_lock = threading.Lock()
+prompt_totals = {"prompts": 0, "original_tokens": 0, "prompt_tokens": 0, "saved_tokens": 0, "truncated": 0}
+
+def record_prompt_stats(stats):
+    with _totals_lock:
+        prompt_totals["prompts"] += 1
+        prompt_totals["original_tokens"] += stats["original_tokens"]
+        prompt_totals["prompt_tokens"] += stats["prompt_tokens"]
+        prompt_totals["saved_tokens"] += stats["saved_tokens"]
+        prompt_totals["truncated"] += int(stats["truncated"])
+
+def get_prompt_stats():
+    with _totals_lock:
+        totals = dict(prompt_totals)
+    totals["max_tokens"] = Config.PROMPT_MAX_TOKENS
+    return totals
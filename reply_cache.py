@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import db
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reply/forward prefixes ("Re:", "Fwd:", "RE: FW:") don't change what the reply should say
+SUBJECT_PREFIX_RE = re.compile(r'^\s*((re|fw|fwd|aw)\s*:\s*)+', re.IGNORECASE)
+
+def normalize_subject(subject):
+    return ' '.join(SUBJECT_PREFIX_RE.sub('', subject or '').split()).lower()
+
+def normalize_body(body_text):
+    return ' '.join((body_text or '').split())
+
+# Content address of a generation request: identical inputs to the same model share one reply
+def reply_cache_key(subject, body_text, prompt_template, custom_prompt, model_name):
+    parts = [normalize_subject(subject), normalize_body(body_text), prompt_template or '', custom_prompt or '', model_name]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# Generated replies persisted in SQLite with TTL expiry and size-bounded LRU eviction
+class ReplyCache:
+    def __init__(self, db_path="replied_emails.db", ttl=None, max_entries=None):
+        self.db_path = db_path
+        self.ttl = Config.REPLY_CACHE_TTL if ttl is None else ttl
+        self.max_entries = Config.REPLY_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evicted = 0
+
+    def _connect(self):
+        conn = db.connect(self.db_path)
+        if not self._initialized:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS reply_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    reply TEXT NOT NULL,
+                    model TEXT,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_reply_cache_last_used ON reply_cache (last_used)')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    # Cached reply for key, or None if missing or older than the TTL
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT reply, created_at FROM reply_cache WHERE cache_key=?", (key,)).fetchone()
+            if row and self.ttl and now - row[1] > self.ttl:
+                with conn:
+                    conn.execute("DELETE FROM reply_cache WHERE cache_key=?", (key,))
+                row = None
+            if not row:
+                self._count('misses')
+                return None
+            with conn:
+                conn.execute("UPDATE reply_cache SET last_used=?, hits=hits+1 WHERE cache_key=?", (now, key))
+            self._count('hits')
+            return row[0]
+        finally:
+            conn.close()
+
+    # Store a reply, then evict least recently used entries beyond max_entries
+    def put(self, key, reply, model_name=None):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO reply_cache (cache_key, reply, model, created_at, last_used, hits)
+                    VALUES (?, ?, ?, ?, ?, 0)
+                ''', (key, reply, model_name, now, now))
+                if self.max_entries:
+                    evicted = conn.execute('''
+                        DELETE FROM reply_cache WHERE cache_key IN (
+                            SELECT cache_key FROM reply_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                        )
+                    ''', (self.max_entries,)).rowcount
+                    if evicted > 0:
+                        with self._lock:
+                            self.evicted += evicted
+        finally:
+            conn.close()
+
+    # Return the cached reply for these inputs, or call generate_fn() and cache what it returns
+    # force=True skips the lookup (regenerate) but still stores the fresh reply
+    def get_or_generate(self, key, generate_fn, force=False, model_name=None):
+        if force:
+            self._count('bypassed')
+        else:
+            reply = self.get(key)
+            if reply is not None:
+                logger.info("✅ Reply served from cache")
+                return reply
+        reply = generate_fn()
+        if reply:
+            self.put(key, reply, model_name)
+        return reply
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            entries = conn.execute("SELECT COUNT(*) FROM reply_cache").fetchone()[0]
+        finally:
+            conn.close()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evicted": self.evicted,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl
+            }
+
+reply_cache = ReplyCache()
@@ -1,12 +1,15 @@
 import sqlite3
 from datetime import datetime
+import json
 import logging
+import os
+import db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def init_db():
-    conn = sqlite3.connect("replied_emails.db")
+    conn = db.connect()
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS replied_emails (
@@ -21,6 +24,16 @@ def init_db():
             original_body TEXT,
             draft_id TEXT,
             message_id TEXT,
+            preview TEXT,
+            body_text TEXT,
+            body_fetched INTEGER DEFAULT 1,
+            body_truncated INTEGER DEFAULT 0,
+            suggested_reply TEXT,
+            suggestion_status TEXT,
+            suggested_at DATETIME,
+            thread_id TEXT,
+            header_message_id TEXT,
+            header_references TEXT,
             UNIQUE(sender, subject, message_id)
         )
     ''')
@@ -28,15 +41,17 @@ def init_db():
     conn.close()
     logger.info("📂 Database initialized")
 
-def save_email_reply(sender, contact, subject, email_date, reply, reply_date, status, original_body, draft_id, message_id):
+SAVE_EMAIL_REPLY_SQL = '''
+    INSERT OR REPLACE INTO replied_emails 
+    (sender, contact, subject, email_date, reply, reply_date, status, original_body, draft_id, message_id, body_text, preview)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def save_email_reply(sender, contact, subject, email_date, reply, reply_date, status, original_body, draft_id, message_id, body_text=None, preview=None):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
-        c.execute('''
-            INSERT OR REPLACE INTO replied_emails 
-            (sender, contact, subject, email_date, reply, reply_date, status, original_body, draft_id, message_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (sender, contact, subject, email_date, reply, reply_date, status, original_body, draft_id, message_id))
+        c.execute(SAVE_EMAIL_REPLY_SQL, (sender, contact, subject, email_date, reply, reply_date, status, original_body, draft_id, message_id, body_text, preview))
         conn.commit()
         logger.info(f"📥 Reply saved to database for {subject}")
     except sqlite3.IntegrityError as e:
@@ -48,9 +63,43 @@ def save_email_reply(sender, contact, subject, email_date, reply, reply_date, st
     finally:
         conn.close()
 
+# Buffers rows and writes them with executemany in one transaction per flush
+class EmailBatchWriter:
+    def __init__(self, conn, sql=SAVE_EMAIL_REPLY_SQL):
+        self.conn = conn
+        self.sql = sql
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+
+    # Write buffered rows and return how many were inserted or replaced
+    def flush(self):
+        if not self.rows:
+            return 0
+        rows, self.rows = self.rows, []
+        before = self.conn.total_changes
+        try:
+            with self.conn:
+                self.conn.executemany(self.sql, rows)
+        except sqlite3.Error as e:
+            # One bad row rolls back the batch; retry row by row so the rest still land
+            logger.error(f"⚠️ Batch write of {len(rows)} rows failed, retrying individually: {e}")
+            # total_changes still counts the rolled-back rows
+            before = self.conn.total_changes
+            with self.conn:
+                for row in rows:
+                    try:
+                        self.conn.execute(self.sql, row)
+                    except sqlite3.Error as row_error:
+                        logger.error(f"⚠️ Skipping row that failed to save: {row_error}")
+        written = self.conn.total_changes - before
+        logger.info(f"📥 Saved {written} of {len(rows)} rows in one transaction")
+        return written
+
 def update_email_reply(sender, subject, reply, draft_id):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         c.execute('''
             UPDATE replied_emails 
@@ -70,7 +119,7 @@ def update_email_reply(sender, subject, reply, draft_id):
 
 def update_draft_id_in_db(sender, subject, draft_id):
     try:
-        conn = sqlite3.connect("replied_emails.db")
+        conn = db.connect()
         c = conn.cursor()
         c.execute('''
             UPDATE replied_emails 
@@ -86,4 +135,47 @@ def update_draft_id_in_db(sender, subject, draft_id):
         logger.error(f"⚠️ Error updating draft_id in database: {e}")
         raise
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+REPLIED_LOG_FILE = "replied_log.json"
+
+# Create the indexed table of message ids that already have a reply, importing replied_log.json on first start
+def init_replied_ids(conn, log_file=REPLIED_LOG_FILE):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replied_ids (
+            message_id TEXT PRIMARY KEY,
+            replied_at DATETIME
+        )
+    ''')
+    conn.commit()
+    if os.path.exists(log_file):
+        migrate_replied_log(conn, log_file)
+
+# Import ids from the legacy JSON log, then rename it so the import runs once
+# Older entries are plain ids; newer ones are dicts carrying a message_id
+def migrate_replied_log(conn, log_file=REPLIED_LOG_FILE):
+    try:
+        with open(log_file, 'r') as f:
+            entries = json.load(f)
+        ids = [entry.get('message_id') if isinstance(entry, dict) else entry for entry in entries]
+        save_replied_ids(conn, [message_id for message_id in ids if message_id])
+        os.replace(log_file, log_file + ".migrated")
+        logger.info(f"✅ Migrated {len(ids)} replied ids from {log_file}")
+    except Exception as e:
+        logger.error(f"⚠️ Error migrating {log_file}: {e}")
+
+# Subset of message_ids that already have a reply
+def filter_replied_ids(conn, message_ids):
+    message_ids = list(message_ids)
+    if not message_ids:
+        return set()
+    placeholders = ",".join("?" * len(message_ids))
+    rows = conn.execute(f"SELECT message_id FROM replied_ids WHERE message_id IN ({placeholders})", message_ids)
+    return {row[0] for row in rows}
+
+# Record replied ids in one transaction
+def save_replied_ids(conn, message_ids):
+    replied_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO replied_ids (message_id, replied_at) VALUES (?, ?)", [(message_id, replied_at) for message_id in message_ids])
+
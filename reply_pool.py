@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Gemini calls spend nearly all their time waiting on the network, so they run side by side on a shared pool
+# The pool size is the concurrency limit across every request using it
+executor = ThreadPoolExecutor(max_workers=Config.AI_REPLY_CONCURRENCY, thread_name_prefix="ai-reply")
+
+# Run generate_fn(*args) for every tuple in items on the pool
+# Returns results in the same order as items; an item whose call raised gets None
+def generate_replies(generate_fn, items, pool=None):
+    pool = pool or executor
+    futures = [pool.submit(generate_fn, *args) for args in items]
+    results = []
+    for index, future in enumerate(futures, start=1):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logger.error(f"⚠️ Error generating reply {index}/{len(items)}: {e}")
+            results.append(None)
+    return results
@@ -0,0 +1,34 @@
+import html
+import re
+import bleach
+
+# Cleaners are built once; bleach.clean would rebuild its parser and filters on every call
+HTML_CLEANER = bleach.Cleaner(tags=['p', 'strong', 'em', 'a'], attributes={'a': ['href']})
+TEXT_CLEANER = bleach.Cleaner(tags=[], strip=True)
+
+PREVIEW_LENGTH = 200
+
+# Sanitize text to prevent XSS
+def sanitize_text(text):
+    return HTML_CLEANER.clean(text) if text else ""
+
+# Strip all markup, leaving readable plain text
+def to_plain_text(text):
+    if not text:
+        return ""
+    plain = html.unescape(TEXT_CLEANER.clean(text))
+    plain = re.sub(r'[ \t\r\f\v]+', ' ', plain)
+    return re.sub(r'\n\s*\n+', '\n\n', plain).strip()
+
+# Short single-line preview for list views
+def make_preview(plain_text, length=PREVIEW_LENGTH):
+    preview = ' '.join(plain_text.split())
+    if len(preview) > length:
+        preview = preview[:length].rstrip() + '…'
+    return preview
+
+# Sanitized HTML, plain text and preview for a raw email body, computed once at ingest
+def prepare_body(raw_body):
+    body_html = sanitize_text(raw_body)
+    body_text = to_plain_text(raw_body)
+    return body_html, body_text, make_preview(body_text)
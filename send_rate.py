@@ -0,0 +1,93 @@
+from collections import deque
+from email.utils import parseaddr
+import logging
+import threading
+import time
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+
+def recipient_domain(address):
+    email_address = parseaddr(address or '')[1]
+    return email_address.rsplit('@', 1)[-1].lower() if '@' in email_address else ''
+
+# Sliding-window send budgets per minute, hour and day, plus a minimum gap between sends to one domain
+# Times are wall-clock seconds so the daily window can be seeded from sends made before a restart
+class SendRateLimiter:
+    def __init__(self, per_minute=None, per_hour=None, per_day=None, domain_spacing=None):
+        self.budgets = [
+            (MINUTE, per_minute or Config.SEND_PER_MINUTE),
+            (HOUR, per_hour or Config.SEND_PER_HOUR),
+            (DAY, per_day or Config.SEND_PER_DAY),
+        ]
+        self.domain_spacing = Config.SEND_DOMAIN_SPACING if domain_spacing is None else domain_spacing
+        self._lock = threading.Lock()
+        self._sent = deque()  # send times in the last day, oldest first
+        self._last_by_domain = {}
+
+    # Earliest time at or after now that a send to domain fits every budget (caller holds _lock or owns the copies)
+    def _earliest(self, sent, last_by_domain, domain, now):
+        earliest = now
+        for window, budget in self.budgets:
+            if len(sent) >= budget:
+                earliest = max(earliest, sent[-budget] + window)
+        if domain in last_by_domain:
+            earliest = max(earliest, last_by_domain[domain] + self.domain_spacing)
+        return earliest
+
+    def _prune(self, now):
+        while self._sent and self._sent[0] <= now - DAY:
+            self._sent.popleft()
+
+    # Record sends made before startup (e.g. from the database) so the daily budget survives a restart
+    def seed(self, timestamps):
+        with self._lock:
+            self._sent = deque(sorted(list(self._sent) + [t for t in timestamps if t > time.time() - DAY]))
+        logger.info(f"📮 Send budget seeded with {len(self._sent)} sends from the last day")
+
+    # Claim a send slot for domain: returns 0 and records the send if one is free now,
+    # otherwise the seconds to wait before asking again
+    def reserve(self, domain=''):
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            delay = self._earliest(self._sent, self._last_by_domain, domain, now) - now
+            if delay > 0:
+                return delay
+            self._sent.append(now)
+            self._last_by_domain[domain] = now
+            return 0
+
+    # Projected finish time (epoch seconds) for sends to these domains, in order, if they went out as fast as the budgets allow
+    def project(self, domains):
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            sent = list(self._sent)
+            last_by_domain = dict(self._last_by_domain)
+        finish = now
+        for domain in domains:
+            finish = self._earliest(sent, last_by_domain, domain, finish)
+            sent.append(finish)
+            last_by_domain[domain] = finish
+        return finish
+
+    def snapshot(self):
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            used = {
+                label: sum(1 for t in self._sent if t > now - window)
+                for label, (window, _) in zip(("minute", "hour", "day"), self.budgets)
+            }
+        stats = {
+            label: {"used": used[label], "budget": budget}
+            for label, (_, budget) in zip(("minute", "hour", "day"), self.budgets)
+        }
+        stats["domain_spacing"] = self.domain_spacing
+        return stats
+
+send_limiter = SendRateLimiter()
@@ -0,0 +1,120 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from bulk_jobs import BulkSendScheduler, init_bulk_job_tables, create_bulk_job, get_bulk_job, cancel_bulk_job
+from send_rate import SendRateLimiter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_db():
+    db_path = os.path.join(tempfile.mkdtemp(), "replied_emails.db")
+    init_bulk_job_tables(db_path)
+    return db_path
+
+def make_items(count):
+    return [
+        {"message_id": f"m{i}", "sender": f"user{i}@example.com", "subject": f"Subject {i}", "email_date": "2024-01-01", "draft_id": None}
+        for i in range(count)
+    ]
+
+class FakeGmail:
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.sent = []
+        self.drafts = set()
+
+    def prepare(self, job, items):
+        return {item['position']: f"AI reply for {item['sender']}" for item in items if item['message_id'] != "m1"}
+
+    def stage(self, job, item):
+        draft_id = f"d-{item['message_id']}"
+        self.drafts.add(draft_id)
+        return {"draft_id": draft_id}
+
+    def deliver(self, job, item):
+        if item['message_id'] in self.fail_for:
+            raise RuntimeError("send failed")
+        self.drafts.discard(item['draft_id'])
+        self.sent.append((item['message_id'], item['reply']))
+
+    def was_delivered(self, item):
+        return item['draft_id'] not in self.drafts
+
+def scheduler_for(gmail, db_path, domain_spacing=0):
+    limiter = SendRateLimiter(per_minute=1000, per_hour=1000, per_day=1000, domain_spacing=domain_spacing)
+    return BulkSendScheduler(gmail.prepare, gmail.stage, gmail.deliver, gmail.was_delivered, db_path=db_path, limiter=limiter)
+
+def test_job_sends_every_item_and_records_failures():
+    db_path = make_db()
+    gmail = FakeGmail(fail_for={"m2"})
+    job_id = create_bulk_job(make_items(4), "Hello", message="Shared text", db_path=db_path)
+    scheduler_for(gmail, db_path).run_job(get_bulk_job(job_id, db_path=db_path))
+
+    job = get_bulk_job(job_id, include_items=True, db_path=db_path)
+    assert job['status'] == "completed"
+    assert job['counts']['sent'] == 3 and job['counts']['failed'] == 1
+    assert [item['status'] for item in job['items']] == ["sent", "sent", "failed", "sent"]
+    assert gmail.sent == [("m0", "Shared text"), ("m1", "Shared text"), ("m3", "Shared text")]
+
+def test_ai_job_stores_replies_before_sending():
+    db_path = make_db()
+    gmail = FakeGmail()
+    job_id = create_bulk_job(make_items(3), "Hello", use_ai_reply=True, db_path=db_path)
+    scheduler_for(gmail, db_path).run_job(get_bulk_job(job_id, db_path=db_path))
+
+    job = get_bulk_job(job_id, include_items=True, db_path=db_path)
+    assert [item['status'] for item in job['items']] == ["sent", "failed", "sent"]  # no reply generated for m1
+    assert gmail.sent == [("m0", "AI reply for user0@example.com"), ("m2", "AI reply for user2@example.com")]
+
+def test_restart_settles_interrupted_send_without_resending():
+    db_path = make_db()
+    gmail = FakeGmail()
+    job_id = create_bulk_job(make_items(3), "Hello", message="Shared text", db_path=db_path)
+    # Simulate a crash: m0 was sent, m1 went out but was still marked 'sending', m2 never started
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE bulk_jobs SET status='running' WHERE job_id=?", (job_id,))
+        conn.execute("UPDATE bulk_job_items SET status='sent' WHERE position=0")
+        conn.execute("UPDATE bulk_job_items SET status='sending', draft_id='d-m1' WHERE position=1")
+    conn.close()
+
+    scheduler = scheduler_for(gmail, db_path)
+    scheduler.start()
+    deadline = time.monotonic() + 5
+    while get_bulk_job(job_id, db_path=db_path)['status'] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    scheduler.stop()
+
+    assert get_bulk_job(job_id, db_path=db_path)['counts']['sent'] == 3
+    assert gmail.sent == [("m2", "Shared text")]
+
+def test_cancel_stops_remaining_sends():
+    db_path = make_db()
+    gmail = FakeGmail()
+    job_id = create_bulk_job(make_items(5), "Hello", message="Shared text", db_path=db_path)
+    scheduler = scheduler_for(gmail, db_path, domain_spacing=0.3)
+    scheduler.start()
+    deadline = time.monotonic() + 5
+    while not gmail.sent and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert cancel_bulk_job(job_id, db_path=db_path)
+    scheduler.wake()
+    while get_bulk_job(job_id, db_path=db_path)['status'] != "cancelled" and time.monotonic() < deadline:
+        time.sleep(0.02)
+    scheduler.stop()
+
+    job = get_bulk_job(job_id, db_path=db_path)
+    assert job['status'] == "cancelled"
+    assert job['counts']['sent'] == len(gmail.sent) < 5
+    assert job['counts']['cancelled'] == 5 - len(gmail.sent)
+    assert not cancel_bulk_job(job_id, db_path=db_path)  # already finished
+
+if __name__ == "__main__":
+    test_job_sends_every_item_and_records_failures()
+    test_ai_job_stores_replies_before_sending()
+    test_restart_settles_interrupted_send_without_resending()
+    test_cancel_stops_remaining_sends()
+    logger.info("✅ Bulk job tests passed")
@@ -0,0 +1,39 @@
+import logging
+from bulk_template import BulkTemplate, TemplateError, template_values, split_address
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_renders_recipient_fields():
+    template = BulkTemplate("Dear {first_name},\nRe \"{subject}\" of {original_date} ({email}). {{braces}}")
+    values = template_values("Ali Khan <ali@example.com>", "Fee voucher", "2024-03-05 10:00:00")
+    assert template.render(values) == 'Dear Ali,\nRe "Fee voucher" of 05 March 2024 (ali@example.com). {braces}'
+    assert template.fields == {"first_name", "subject", "original_date", "email"}
+
+def test_sanitized_once_and_static_text_reused():
+    template = BulkTemplate("Hi <script>alert(1)</script> all")
+    assert "<script>" not in template.text
+    assert template.render({}) is template.render({})
+
+def test_rejects_unknown_or_malformed_placeholders():
+    for text in ("Hi {nickname}", "Hi {first_name!r}", "Hi {first_name:>10}", "Unbalanced {"):
+        try:
+            BulkTemplate(text)
+        except TemplateError:
+            continue
+        raise AssertionError(f"{text!r} was accepted")
+
+def test_values_fall_back_for_bare_addresses():
+    values = template_values("sara.ahmed@example.com", None, "not a date")
+    assert values["first_name"] == "Sara"
+    assert values["name"] == "Sara"
+    assert values["subject"] == "No Subject"
+    assert values["original_date"] == "not a date"
+    assert split_address('"Khan, Ali" <ali@example.com>') == ("Khan, Ali", "ali@example.com")
+
+if __name__ == "__main__":
+    test_renders_recipient_fields()
+    test_sanitized_once_and_static_text_reused()
+    test_rejects_unknown_or_malformed_placeholders()
+    test_values_fall_back_for_bare_addresses()
+    logger.info("✅ Bulk template tests passed")
@@ -0,0 +1,83 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def temp_pool():
+    return db.ConnectionPool(os.path.join(tempfile.mkdtemp(), "test.db"), max_idle=2)
+
+def test_pragmas_applied():
+    pool = temp_pool()
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    conn.close()
+    pool.close_all()
+
+def test_connection_reused_and_rolled_back():
+    pool = temp_pool()
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    raw = conn._conn
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        pass
+    else:
+        raise AssertionError("closed connection still usable")
+
+    conn = pool.acquire()
+    assert conn._conn is raw
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()
+    pool.close_all()
+
+def test_context_manager_commits():
+    pool = temp_pool()
+    conn = pool.acquire()
+    with conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    other = sqlite3.connect(pool.db_path)
+    assert other.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    other.close()
+    pool.close_all()
+
+def test_reader_not_blocked_by_open_write():
+    pool = temp_pool()
+    writer = pool.acquire()
+    writer.execute("CREATE TABLE t (x INTEGER)")
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+    writer.execute("INSERT INTO t VALUES (2)")
+
+    # A dashboard read from another thread sees the committed row without waiting on the writer
+    result = {}
+    def read():
+        reader = pool.acquire()
+        result['count'] = reader.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+        reader.close()
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join(timeout=2)
+    assert result.get('count') == 1
+
+    writer.commit()
+    writer.close()
+    pool.close_all()
+
+if __name__ == "__main__":
+    test_pragmas_applied()
+    test_connection_reused_and_rolled_back()
+    test_context_manager_commits()
+    test_reader_not_blocked_by_open_write()
+    logger.info("✅ Database pool tests passed")
@@ -0,0 +1,41 @@
+import logging
+from dedupe import cluster_texts, cluster_sizes, personalize_reply, sender_first_name, similarity_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUESTION = "When is the last date to submit the fee voucher for this semester, and can it be paid online through the bank app?"
+
+def email(greeting, name, question=QUESTION):
+    return similarity_text("Fee voucher", f"{greeting},\nThis is {name}. {question}\nRegards,\n{name}")
+
+def test_groups_near_duplicates_and_keeps_distinct_questions_apart():
+    items = [
+        ("a", email("Dear Sir", "Ali")),
+        ("b", email("Hello Sir", "Sara")),
+        ("c", email("Hi", "Usman", "My lab access card stopped working yesterday. Who should I contact to get it reactivated?")),
+        ("d", email("Respected Sir", "Hina")),
+    ]
+    clusters = cluster_texts(items)
+    assert clusters == [["a", "b", "d"], ["c"]]
+    assert cluster_sizes(clusters) == {"a": 3, "b": 3, "d": 3, "c": 1}
+
+def test_empty_bodies_stay_singletons():
+    assert cluster_texts([("a", ""), ("b", "")]) == [["a"], ["b"]]
+
+def test_sender_first_name():
+    assert sender_first_name('"Ali Khan" <ali@example.com>') == "Ali"
+    assert sender_first_name("sara.ahmed92@example.com") == "Sara"
+    assert sender_first_name("<noor_f@example.com>") == "Noor"
+
+def test_personalizes_shared_reply_per_sender():
+    reply = "Dear Ali,\n\nThe fee voucher is due on Friday.\n\nBest regards,\nRao Faizan Raza"
+    assert personalize_reply(reply, "Ali Khan <ali@example.com>", "Sara <sara@example.com>").startswith("Dear Sara,")
+    assert personalize_reply(reply, "Ali Khan <ali@example.com>", "ali.raza@example.com") == reply
+
+if __name__ == "__main__":
+    test_groups_near_duplicates_and_keeps_distinct_questions_apart()
+    test_empty_bodies_stay_singletons()
+    test_sender_first_name()
+    test_personalizes_shared_reply_per_sender()
+    logger.info("✅ Dedupe tests passed")
@@ -0,0 +1,66 @@
+import json
+import logging
+import sqlite3
+from urllib.parse import urlparse, parse_qs
+import httplib2
+from googleapiclient.discovery import build
+from draft_sync import LiveDrafts, list_live_draft_ids, reconcile_draft_ids, normalize_draft_id
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fake HTTP transport serving drafts.list in pages and counting round trips
+class FakeDraftsTransport:
+    def __init__(self, draft_ids, page_size=2):
+        self.draft_ids = list(draft_ids)
+        self.page_size = page_size
+        self.round_trips = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.round_trips += 1
+        query = parse_qs(urlparse(uri).query)
+        start = int(query.get("pageToken", ["0"])[0])
+        payload = {"drafts": [{"id": draft_id} for draft_id in self.draft_ids[start:start + self.page_size]]}
+        if start + self.page_size < len(self.draft_ids):
+            payload["nextPageToken"] = str(start + self.page_size)
+        return httplib2.Response({"status": 200}), json.dumps(payload).encode()
+
+def make_service(transport):
+    return build("gmail", "v1", http=transport, static_discovery=True, cache_discovery=False)
+
+def test_lists_every_page_once():
+    transport = FakeDraftsTransport(["d1", "d2", "d3", "d4", "d5"])
+    assert list_live_draft_ids(make_service(transport)) == {"d1", "d2", "d3", "d4", "d5"}
+    assert transport.round_trips == 3
+
+def test_live_drafts_cached_within_ttl():
+    transport = FakeDraftsTransport(["d1"])
+    service = make_service(transport)
+    drafts = LiveDrafts(ttl=60)
+    assert drafts.ids(service) == {"d1"}
+    drafts.add("d2")
+    drafts.discard("d1")
+    assert drafts.ids(service) == {"d2"}
+    assert transport.round_trips == 1
+    drafts.invalidate()
+    assert drafts.ids(service) == {"d1"}
+    assert transport.round_trips == 2
+
+def test_reconcile_clears_stale_and_none_ids_in_one_pass():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE replied_emails (message_id TEXT PRIMARY KEY, draft_id TEXT)")
+    rows = [("m1", "d1"), ("m2", "gone"), ("m3", "None"), ("m4", None)]
+    conn.executemany("INSERT INTO replied_emails VALUES (?, ?)", rows)
+    conn.commit()
+
+    assert reconcile_draft_ids(conn, rows, {"d1"}) == {"m1": "d1", "m2": None, "m3": None, "m4": None}
+    assert conn.execute("SELECT message_id, draft_id FROM replied_emails ORDER BY message_id").fetchall() == [
+        ("m1", "d1"), ("m2", None), ("m3", None), ("m4", None)
+    ]
+    assert normalize_draft_id("None") is None and normalize_draft_id("d1") == "d1"
+
+if __name__ == "__main__":
+    test_lists_every_page_once()
+    test_live_drafts_cached_within_ttl()
+    test_reconcile_clears_stale_and_none_ids_in_one_pass()
+    logger.info("✅ Draft sync tests passed")
@@ -0,0 +1,109 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+import gemini_client
+from gemini_client import get_model, generation_settings, model_signature, stream_text, generate_text, get_gemini_stats, CircuitBreaker, CircuitOpenError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Building a model is local; no request reaches Gemini in these tests
+Config.GOOGLE_API_KEY = Config.GOOGLE_API_KEY or "test-key"
+
+def test_reuses_one_model_per_settings_across_threads():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: get_model(), range(32)))
+    assert all(model is models[0] for model in models)
+    assert models[0].model_name.endswith(Config.GEMINI_MODEL)
+
+def test_different_settings_get_different_models():
+    assert get_model(temperature=0.1) is not get_model(temperature=0.9)
+    assert get_model(temperature=0.1) is get_model(temperature=0.1)
+
+def test_signature_tracks_central_settings():
+    assert model_signature() == model_signature(Config.GEMINI_MODEL, Config.GEMINI_MAX_OUTPUT_TOKENS, Config.GEMINI_TEMPERATURE)
+    assert model_signature() != model_signature(temperature=Config.GEMINI_TEMPERATURE + 0.1)
+
+# Stand-ins for a streamed Gemini response
+class FakeChunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("chunk has no text parts")
+        return self._text
+
+class FakeStreamingModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        assert stream and request_options["timeout"] == Config.GEMINI_TIMEOUT
+        return iter(FakeChunk(text) for text in self.chunks)
+
+def test_stream_yields_text_chunks_and_skips_empty_ones():
+    key = generation_settings(model_name="fake-stream")
+    gemini_client._models[key] = FakeStreamingModel(["Dear ", None, "Ali", ""])
+    assert list(stream_text("prompt", model_name="fake-stream")) == ["Dear ", "Ali"]
+
+    gemini_client._models[key] = FakeStreamingModel([None])
+    try:
+        list(stream_text("prompt", model_name="fake-stream"))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+# Non-streaming stand-in that fails while `down` is set
+class FakeModel:
+    def __init__(self):
+        self.down = True
+        self.calls = 0
+
+    def generate_content(self, prompt, request_options=None):
+        self.calls += 1
+        if self.down:
+            raise TimeoutError("deadline exceeded")
+        return FakeChunk("Hello")
+
+def test_breaker_opens_then_half_open_probe_closes_it():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_open_circuit_fails_fast_and_latency_is_recorded():
+    model = FakeModel()
+    gemini_client._models[generation_settings(model_name="fake-down")] = model
+    for _ in range(Config.GEMINI_BREAKER_FAILURES):
+        try:
+            generate_text("prompt", model_name="fake-down")
+        except TimeoutError:
+            pass
+    try:
+        generate_text("prompt", model_name="fake-down")
+        assert False, "expected CircuitOpenError"
+    except CircuitOpenError:
+        pass
+    assert model.calls == Config.GEMINI_BREAKER_FAILURES
+    stats = get_gemini_stats()["fake-down"]
+    assert stats["circuit"]["state"] == "open" and stats["circuit"]["rejected"] == 1
+    assert stats["latency"]["calls"] == stats["latency"]["errors"] == Config.GEMINI_BREAKER_FAILURES
+    assert stats["latency"]["p50_ms"] is not None
+
+if __name__ == "__main__":
+    test_reuses_one_model_per_settings_across_threads()
+    test_different_settings_get_different_models()
+    test_signature_tracks_central_settings()
+    test_stream_yields_text_chunks_and_skips_empty_ones()
+    test_breaker_opens_then_half_open_probe_closes_it()
+    test_open_circuit_fails_fast_and_latency_is_recorded()
+    logger.info(f"✅ Gemini client tests passed ({len(gemini_client._models)} models built)")
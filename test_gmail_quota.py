@@ -0,0 +1,73 @@
+import logging
+import time
+import httplib2
+from googleapiclient.errors import HttpError
+from gmail_quota import GmailQuotaLimiter, gmail_limiter, is_rate_limit_error
+from gmail_sync import fetch_messages_batched
+from test_gmail_sync import FakeGmailTransport, make_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def http_error(status, reason=""):
+    content = f'{{"error": {{"code": {status}, "errors": [{{"reason": "{reason}"}}]}}}}'.encode()
+    return HttpError(httplib2.Response({"status": status}), content)
+
+# Request stand-in that raises the given errors before succeeding
+class FlakyRequest:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"ok": True}
+
+def test_recognises_throttling_errors():
+    assert is_rate_limit_error(http_error(429))
+    assert is_rate_limit_error(http_error(403, "userRateLimitExceeded"))
+    assert not is_rate_limit_error(http_error(403, "insufficientPermissions"))
+    assert not is_rate_limit_error(ValueError("boom"))
+
+def test_retries_throttled_calls_and_counts_units():
+    limiter = GmailQuotaLimiter(units_per_second=1000, max_retries=3, base_delay=0.01, max_delay=0.01)
+    request = FlakyRequest(http_error(429), http_error(403, "rateLimitExceeded"))
+    assert limiter.execute("drafts.send", request) == {"ok": True}
+    snapshot = limiter.snapshot()
+    assert request.calls == 3
+    assert snapshot["units_by_method"] == {"drafts.send": 300}
+    assert snapshot["throttled"] == 2 and snapshot["retries"] == 2
+
+def test_gives_up_after_max_retries_and_passes_other_errors_through():
+    limiter = GmailQuotaLimiter(units_per_second=1000, max_retries=1, base_delay=0.01, max_delay=0.01)
+    for request in (FlakyRequest(http_error(429), http_error(429)), FlakyRequest(http_error(404))):
+        try:
+            limiter.execute("messages.get", request)
+            assert False, "expected HttpError"
+        except HttpError:
+            pass
+
+def test_token_bucket_paces_calls_to_the_rate():
+    limiter = GmailQuotaLimiter(units_per_second=100, burst=10)
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire("drafts.create")  # 10 units each
+    assert time.monotonic() - started >= 0.25
+
+def test_batched_fetch_retries_only_throttled_messages():
+    gmail_limiter.base_delay = gmail_limiter.max_delay = 0.01
+    transport = FakeGmailTransport(throttle_once={"m2", "m4"})
+    results = list(fetch_messages_batched(make_service(transport), [f"m{i}" for i in range(5)], batch_size=5))
+    assert [message_id for message_id, _, _ in results] == [f"m{i}" for i in range(5)]
+    assert all(error is None for _, _, error in results)
+    assert transport.round_trips == 2
+
+if __name__ == "__main__":
+    test_recognises_throttling_errors()
+    test_retries_throttled_calls_and_counts_units()
+    test_gives_up_after_max_retries_and_passes_other_errors_through()
+    test_token_bucket_paces_calls_to_the_rate()
+    test_batched_fetch_retries_only_throttled_messages()
+    logger.info("✅ Gmail quota limiter tests passed")
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import tempfile
+import threading
+from gmail_service import GmailServiceHolder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stand-in for google.oauth2 credentials that counts refreshes instead of calling Google
+class FakeCredentials:
+    def __init__(self, expires_in):
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=expires_in)
+        self.refresh_token = "refresh"
+        self.valid = True
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+
+    def to_json(self):
+        return "{}"
+
+def make_holder(creds):
+    holder = GmailServiceHolder(token_path=os.path.join(tempfile.mkdtemp(), "token.json"), refresh_margin=300)
+    holder._creds = creds
+    return holder
+
+def test_refreshes_only_near_expiry():
+    fresh = FakeCredentials(expires_in=3600)
+    make_holder(fresh).get_credentials()
+    assert fresh.refreshes == 0
+
+    expiring = FakeCredentials(expires_in=60)
+    holder = make_holder(expiring)
+    holder.get_credentials()
+    holder.get_credentials()
+    assert expiring.refreshes == 1
+
+def test_service_is_built_once_per_thread():
+    holder = make_holder(FakeCredentials(expires_in=3600))
+    first = holder.get_service()
+    assert holder.get_service() is first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(holder.get_service()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+def test_override_replaces_service():
+    holder = make_holder(FakeCredentials(expires_in=3600))
+    fake = object()
+    holder.override(fake)
+    assert holder.get_service() is fake
+
+    holder.override(None)
+    assert holder.get_service() is not fake
+
+if __name__ == "__main__":
+    test_refreshes_only_near_expiry()
+    test_service_is_built_once_per_thread()
+    test_override_replaces_service()
+    logger.info("✅ Gmail service holder tests passed")
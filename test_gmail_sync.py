@@ -0,0 +1,173 @@
+import json
+import logging
+from urllib.parse import urlparse, parse_qs
+from email.parser import Parser
+import httplib2
+from googleapiclient.discovery import build
+from gmail_sync import fetch_messages_batched, iter_message_id_pages, iter_sync_pages
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fake HTTP transport that answers Gmail calls locally and counts round trips
+class FakeGmailTransport:
+    def __init__(self, fail_ids=(), inbox_size=0, history=(), history_id="500", history_expired=False, throttle_once=()):
+        self.round_trips = 0
+        self.fail_ids = set(fail_ids)
+        self.throttle_once = set(throttle_once)
+        self.inbox_size = inbox_size
+        self.history = list(history)
+        self.history_id = history_id
+        self.history_expired = history_expired
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.round_trips += 1
+        path = urlparse(uri).path
+        if path.endswith("/profile"):
+            return httplib2.Response({"status": 200}), json.dumps({"historyId": self.history_id}).encode()
+        if path.endswith("/history"):
+            if self.history_expired:
+                return httplib2.Response({"status": 404}), b'{"error": {"code": 404, "message": "Not Found"}}'
+            payload = {"historyId": self.history_id}
+            if self.history:
+                payload["history"] = self.history
+            return httplib2.Response({"status": 200}), json.dumps(payload).encode()
+        if path.endswith("/messages"):
+            return self._list_response(parse_qs(urlparse(uri).query))
+        if not uri.rstrip("/").endswith("/batch"):
+            message_id = uri.split("?")[0].rsplit("/", 1)[-1]
+            return self._single_response(message_id)
+
+        # Batch body is multipart/mixed; echo each part's Content-ID back with its message
+        batch = Parser().parsestr(f"Content-Type: {headers['content-type']}\r\n\r\n{body}")
+        boundary = "fake_batch_boundary"
+        parts = []
+        for part in batch.get_payload():
+            request_line = part.get_payload().split("\n", 1)[0]
+            message_id = request_line.split()[1].split("?")[0].rsplit("/", 1)[-1]
+            status, payload = self._message(message_id)
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        content = "".join(parts) + f"--{boundary}--"
+        response = httplib2.Response({"status": 200, "content-type": f"multipart/mixed; boundary={boundary}"})
+        return response, content.encode()
+
+    def _message(self, message_id):
+        if message_id in self.throttle_once:
+            self.throttle_once.discard(message_id)
+            return "429 Too Many Requests", {"error": {"code": 429, "message": "Too Many Requests"}}
+        if message_id in self.fail_ids:
+            return "404 Not Found", {"error": {"code": 404, "message": "Not Found"}}
+        return "200 OK", {
+            "id": message_id,
+            "internalDate": "1700000000000",
+            "payload": {"headers": [{"name": "Subject", "value": f"Subject {message_id}"}]}
+        }
+
+    def _list_response(self, params):
+        start = int(params.get("pageToken", ["0"])[0])
+        end = min(start + int(params["maxResults"][0]), self.inbox_size)
+        payload = {"messages": [{"id": f"msg{i}"} for i in range(start, end)]}
+        if end < self.inbox_size:
+            payload["nextPageToken"] = str(end)
+        return httplib2.Response({"status": 200}), json.dumps(payload).encode()
+
+    def _single_response(self, message_id):
+        status, payload = self._message(message_id)
+        return httplib2.Response({"status": int(status.split()[0])}), json.dumps(payload).encode()
+
+def make_service(transport):
+    return build("gmail", "v1", http=transport, static_discovery=True, cache_discovery=False)
+
+def test_batches_round_trips_per_chunk():
+    transport = FakeGmailTransport()
+    service = make_service(transport)
+    message_ids = [f"msg{i}" for i in range(120)]
+
+    results = list(fetch_messages_batched(service, message_ids, batch_size=50))
+
+    assert transport.round_trips == 3
+    assert [message_id for message_id, _, _ in results] == message_ids
+    assert all(error is None and msg["id"] == message_id for message_id, msg, error in results)
+
+def test_per_message_errors_do_not_fail_batch():
+    transport = FakeGmailTransport(fail_ids={"msg3"})
+    service = make_service(transport)
+
+    results = {message_id: (msg, error) for message_id, msg, error in fetch_messages_batched(service, [f"msg{i}" for i in range(5)], batch_size=10)}
+
+    assert transport.round_trips == 1
+    assert results["msg3"][0] is None and results["msg3"][1] is not None
+    assert results["msg4"][0]["id"] == "msg4"
+
+def test_batch_size_is_capped_at_gmail_limit():
+    transport = FakeGmailTransport()
+    service = make_service(transport)
+
+    list(fetch_messages_batched(service, [f"msg{i}" for i in range(250)], batch_size=500))
+
+    assert transport.round_trips == 3
+
+def test_pages_follow_next_page_token_until_cap():
+    transport = FakeGmailTransport(inbox_size=250)
+    service = make_service(transport)
+
+    pages = list(iter_message_id_pages(service, page_size=100, max_messages=0, time_budget=0))
+    assert [len(page) for page in pages] == [100, 100, 50]
+    assert transport.round_trips == 3
+
+    capped = list(iter_message_id_pages(service, page_size=100, max_messages=150, time_budget=0))
+    assert [len(page) for page in capped] == [100, 50]
+
+def test_unchanged_mailbox_costs_one_call():
+    transport = FakeGmailTransport(history_id="500")
+    service = make_service(transport)
+    sync = {}
+
+    pages = list(iter_sync_pages(service, sync, checkpoint="500", label_ids=["INBOX"]))
+
+    assert pages == []
+    assert transport.round_trips == 1
+    assert sync == {"mode": "incremental", "history_id": "500"}
+
+def test_history_yields_added_and_relabelled_messages():
+    history = [
+        {"id": "501", "messagesAdded": [{"message": {"id": "new1", "labelIds": ["INBOX", "UNREAD"]}}]},
+        {"id": "502", "messagesAdded": [{"message": {"id": "read1", "labelIds": ["INBOX"]}}]},
+        {"id": "503", "labelsAdded": [{"message": {"id": "old1", "labelIds": ["INBOX", "UNREAD"]}, "labelIds": ["UNREAD"]}]},
+        {"id": "504", "labelsAdded": [{"message": {"id": "new1", "labelIds": ["INBOX", "UNREAD"]}, "labelIds": ["STARRED"]}]}
+    ]
+    transport = FakeGmailTransport(history=history, history_id="504")
+    service = make_service(transport)
+    sync = {}
+
+    pages = list(iter_sync_pages(service, sync, checkpoint="500", label_ids=["INBOX"], required_labels=["INBOX", "UNREAD"]))
+
+    assert pages == [["new1", "old1"]]
+    assert sync["history_id"] == "504"
+
+def test_expired_checkpoint_falls_back_to_full_resync():
+    transport = FakeGmailTransport(inbox_size=30, history_id="900", history_expired=True)
+    service = make_service(transport)
+    sync = {}
+
+    pages = list(iter_sync_pages(service, sync, checkpoint="1", max_messages=0, time_budget=0))
+
+    assert [len(page) for page in pages] == [30]
+    assert sync == {"mode": "full", "history_id": "900"}
+
+if __name__ == "__main__":
+    test_batches_round_trips_per_chunk()
+    test_per_message_errors_do_not_fail_batch()
+    test_batch_size_is_capped_at_gmail_limit()
+    test_pages_follow_next_page_token_until_cap()
+    test_unchanged_mailbox_costs_one_call()
+    test_history_yields_added_and_relabelled_messages()
+    test_expired_checkpoint_falls_back_to_full_resync()
+    logger.info("✅ Gmail sync tests passed")
@@ -0,0 +1,62 @@
+import base64
+import logging
+from mime_body import extract_body
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def encode(text, charset='utf-8'):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode().rstrip('=')
+
+def part(mime_type, text, **extra):
+    return {'mimeType': mime_type, 'body': {'data': encode(text)}, **extra}
+
+def test_finds_html_in_nested_alternative():
+    payload = {
+        'mimeType': 'multipart/mixed',
+        'parts': [
+            {'mimeType': 'multipart/alternative', 'parts': [
+                part('text/plain', 'plain version'),
+                part('text/html', '<p>html version</p>')
+            ]},
+            {'mimeType': 'application/pdf', 'filename': 'report.pdf', 'body': {'attachmentId': 'att1', 'size': 90000}}
+        ]
+    }
+    assert extract_body(payload) == ('<p>html version</p>', 'text/html', False)
+
+def test_falls_back_to_plain_text_and_skips_attachments():
+    payload = {
+        'mimeType': 'multipart/mixed',
+        'parts': [
+            part('text/html', '<p>attached page</p>', filename='page.html'),
+            part('text/plain', 'hello there')
+        ]
+    }
+    assert extract_body(payload) == ('hello there', 'text/plain', False)
+
+def test_truncates_at_byte_cap():
+    body, mime_type, truncated = extract_body(part('text/plain', 'x' * 200000), max_bytes=1000)
+    assert truncated and len(body) == 1000
+
+def test_decodes_declared_charset_without_splitting_characters():
+    payload = {
+        'mimeType': 'text/plain',
+        'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset="iso-8859-1"'}],
+        'body': {'data': encode('café ' * 3, 'iso-8859-1')}
+    }
+    assert extract_body(payload)[0] == 'café ' * 3
+
+    body, _, truncated = extract_body(part('text/plain', 'é' * 10), max_bytes=5)
+    assert truncated and body == 'éé'
+
+def test_no_inline_text_returns_empty():
+    payload = {'mimeType': 'multipart/mixed', 'parts': [{'mimeType': 'image/png', 'filename': 'a.png', 'body': {'attachmentId': 'x'}}]}
+    assert extract_body(payload) == ('', None, False)
+
+if __name__ == "__main__":
+    test_finds_html_in_nested_alternative()
+    test_falls_back_to_plain_text_and_skips_attachments()
+    test_truncates_at_byte_cap()
+    test_decodes_declared_charset_without_splitting_characters()
+    test_no_inline_text_returns_empty()
+    logger.info("✅ MIME body extractor tests passed")
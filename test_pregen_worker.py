@@ -0,0 +1,79 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from pregen_worker import PregenWorker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_db(statuses):
+    db_path = os.path.join(tempfile.mkdtemp(), "replied_emails.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE replied_emails (
+            message_id TEXT PRIMARY KEY, subject TEXT, email_date TEXT, status TEXT,
+            suggested_reply TEXT, suggestion_status TEXT, suggested_at TEXT
+        )
+    ''')
+    conn.executemany(
+        "INSERT INTO replied_emails (message_id, subject, email_date, status) VALUES (?, ?, ?, ?)",
+        [(f"m{i}", f"Subject {i}", f"2024-01-0{i + 1}", status) for i, status in enumerate(statuses)]
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+def suggestions(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT message_id, suggestion_status, suggested_reply FROM replied_emails ORDER BY message_id").fetchall()
+    conn.close()
+    return rows
+
+def load_bodies(ids):
+    return {message_id: ("<p>body</p>", "body") for message_id in ids}
+
+def fake_generate(subject, body_text):
+    if subject == "Subject 2":
+        raise ValueError("model error")
+    return f"Reply to {subject}: {body_text}"
+
+def test_generates_suggestions_for_unread_only_within_budget():
+    db_path = make_db(["unread", "no-reply", "unread", "unread", "sent"])
+    worker = PregenWorker(fake_generate, load_bodies, db_path=db_path, concurrency=2, hourly_budget=2)
+    worker._resumed.set()
+    assert worker.scan() == 2  # budget caps the newest two unread: m3, m2
+    while not worker.queue.empty():
+        worker.process(*worker.queue.get())
+    assert suggestions(db_path) == [
+        ("m0", None, None), ("m1", None, None), ("m2", "failed", None),
+        ("m3", "ready", "Reply to Subject 3: body"), ("m4", None, None)
+    ]
+    assert worker.scan() == 0  # budget spent for this hour
+    assert worker.status()["budget_remaining"] == 0
+
+def test_background_threads_pause_and_resume():
+    db_path = make_db([])
+    worker = PregenWorker(fake_generate, load_bodies, db_path=db_path, concurrency=2, hourly_budget=10, scan_interval=0.05)
+    worker.start()
+    worker.pause()
+    assert worker.status()["state"] == "paused"
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO replied_emails (message_id, subject, status) VALUES (?, ?, 'unread')", [("a", "A"), ("b", "B")])
+    conn.commit()
+    conn.close()
+    time.sleep(0.2)
+    assert [row[1] for row in suggestions(db_path)] == [None, None]
+
+    worker.resume()
+    deadline = time.monotonic() + 5
+    while worker.status()["generated"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    worker.stop()
+    assert [row[1] for row in suggestions(db_path)] == ["ready", "ready"]
+
+if __name__ == "__main__":
+    test_generates_suggestions_for_unread_only_within_budget()
+    test_background_threads_pause_and_resume()
+    logger.info("✅ Pre-generation worker tests passed")
@@ -0,0 +1,53 @@
+import logging
+from prompt_builder import build_prompt, clean_body, strip_quoted_history, strip_signature, truncate_middle, estimate_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_drops_reply_history_and_quoted_lines():
+    body = (
+        "Thanks, Friday works for me.\n"
+        "> inline quote\n"
+        "\n"
+        "On Mon, Jan 1, 2024 at 10:00 AM Ali Khan <ali@example.com>\n"
+        "wrote:\n"
+        "> Can we meet on Friday?\n"
+        "> Long earlier thread..."
+    )
+    assert strip_quoted_history(body) == "Thanks, Friday works for me."
+
+def test_drops_outlook_original_message_but_keeps_bare_forward_body():
+    outlook = "See below.\n\nFrom: Sara\nSent: Monday\nTo: Team\nSubject: Plan\n\nOld text"
+    assert strip_quoted_history(outlook) == "See below."
+    forward = "---------- Forwarded message ---------\nFrom: Sara <s@example.com>\nDate: Mon\nSubject: Fees\nTo: me\n\nWhen are fees due?"
+    assert strip_quoted_history(forward) == "When are fees due?"
+
+def test_drops_trailing_signature_only():
+    body = "Please send the syllabus.\nThanks\n-- \nAli Khan\nStudent, Batch 12\nSent from my iPhone"
+    assert strip_signature(body) == "Please send the syllabus.\nThanks"
+    assert strip_signature("-- \nonly a signature") == "-- \nonly a signature"
+
+def test_truncates_from_the_middle_keeping_head_and_tail():
+    text = "HEAD " + "x" * 10000 + " TAIL"
+    short, truncated = truncate_middle(text, 100)
+    assert truncated and short.startswith("HEAD") and short.endswith("TAIL")
+    assert "characters omitted" in short and len(short) <= 400
+
+def test_prompt_respects_budget_and_reports_savings():
+    body = "Question about the exam.\n" + "filler " * 3000 + "\nOn Tue, Bob wrote:\n> " + "old " * 2000
+    prompt, stats = build_prompt("Subject: {subject}\n\n{body_text}", "Exam", body, max_tokens=300)
+    assert estimate_tokens(prompt) <= 300 and stats["prompt_tokens"] <= 300
+    assert stats["truncated"] and "old old" not in prompt and prompt.startswith("Subject: Exam")
+    assert stats["saved_tokens"] == stats["original_tokens"] - stats["prompt_tokens"] > 0
+
+def test_clean_body_leaves_plain_mail_alone():
+    assert clean_body("Hello,\nwhen is the next class?") == "Hello,\nwhen is the next class?"
+
+if __name__ == "__main__":
+    test_drops_reply_history_and_quoted_lines()
+    test_drops_outlook_original_message_but_keeps_bare_forward_body()
+    test_drops_trailing_signature_only()
+    test_truncates_from_the_middle_keeping_head_and_tail()
+    test_prompt_respects_budget_and_reports_savings()
+    test_clean_body_leaves_plain_mail_alone()
+    logger.info("✅ Prompt builder tests passed")
@@ -0,0 +1,65 @@
+import logging
+import os
+import tempfile
+from reply_cache import ReplyCache, reply_cache_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_cache(**kwargs):
+    return ReplyCache(db_path=os.path.join(tempfile.mkdtemp(), "cache.db"), **kwargs)
+
+# generate_fn stand-in that counts model calls
+class Generator:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+def test_key_ignores_reply_prefixes_and_whitespace():
+    a = reply_cache_key("Re: Fee  schedule", "Hello,\n\n  when is it due?", "tpl", None, "gemini")
+    b = reply_cache_key("FWD: re: fee schedule", "Hello, when is it due?", "tpl", None, "gemini")
+    assert a == b
+    assert a != reply_cache_key("Fee schedule", "Hello, when is it due?", "tpl", None, "other-model")
+    assert a != reply_cache_key("Fee schedule", "Hello, when is it due?", "tpl", "be brief", "gemini")
+
+def test_hits_misses_and_forced_regeneration():
+    cache, generate = make_cache(), Generator()
+    assert cache.get_or_generate("k", generate) == "reply 1"
+    assert cache.get_or_generate("k", generate) == "reply 1"
+    assert cache.get_or_generate("k", generate, force=True) == "reply 2"
+    assert cache.get_or_generate("k", generate) == "reply 2"
+    stats = cache.stats()
+    assert generate.calls == 2
+    assert (stats["hits"], stats["misses"], stats["bypassed"]) == (2, 1, 1)
+
+def test_expired_entries_are_regenerated():
+    cache, generate = make_cache(ttl=-1), Generator()
+    cache.get_or_generate("k", generate)
+    cache.get_or_generate("k", generate)
+    assert generate.calls == 2
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    cache = make_cache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["entries"] == 2
+
+def test_failed_generation_is_not_cached():
+    cache = make_cache()
+    assert cache.get_or_generate("k", lambda: "") == ""
+    assert cache.get("k") is None
+
+if __name__ == "__main__":
+    test_key_ignores_reply_prefixes_and_whitespace()
+    test_hits_misses_and_forced_regeneration()
+    test_expired_entries_are_regenerated()
+    test_evicts_least_recently_used_beyond_max_entries()
+    test_failed_generation_is_not_cached()
+    logger.info("✅ Reply cache tests passed")
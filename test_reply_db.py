@@ -0,0 +1,56 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from reply_db import EmailBatchWriter, init_replied_ids, filter_replied_ids, save_replied_ids
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE items (id TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    return conn
+
+def test_batch_writer_flushes_in_one_go():
+    conn = make_conn()
+    writer = EmailBatchWriter(conn, "INSERT OR IGNORE INTO items (id, value) VALUES (?, ?)")
+    for i in range(5):
+        writer.add((f"id{i}", "v"))
+    writer.add(("id0", "duplicate"))
+
+    assert writer.flush() == 5
+    assert writer.rows == []
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 5
+
+def test_batch_writer_keeps_good_rows_when_one_fails():
+    conn = make_conn()
+    writer = EmailBatchWriter(conn, "INSERT INTO items (id, value) VALUES (?, ?)")
+    writer.add(("a", "v"))
+    writer.add(("b", None))
+    writer.add(("c", "v"))
+
+    assert writer.flush() == 2
+    assert [row[0] for row in conn.execute("SELECT id FROM items ORDER BY id")] == ["a", "c"]
+
+def test_replied_log_is_migrated_once():
+    log_file = os.path.join(tempfile.mkdtemp(), "replied_log.json")
+    with open(log_file, "w") as f:
+        json.dump(["m1", {"message_id": "m2", "subject": "Hi"}, "m1"], f)
+    conn = sqlite3.connect(":memory:")
+
+    init_replied_ids(conn, log_file)
+
+    assert not os.path.exists(log_file) and os.path.exists(log_file + ".migrated")
+    assert filter_replied_ids(conn, ["m1", "m2", "m3"]) == {"m1", "m2"}
+
+    save_replied_ids(conn, ["m3"])
+    assert filter_replied_ids(conn, ["m3", "m4"]) == {"m3"}
+    assert filter_replied_ids(conn, []) == set()
+
+if __name__ == "__main__":
+    test_batch_writer_flushes_in_one_go()
+    test_batch_writer_keeps_good_rows_when_one_fails()
+    test_replied_log_is_migrated_once()
+    logger.info("✅ Reply database tests passed")
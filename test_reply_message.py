@@ -0,0 +1,42 @@
+import base64
+import email
+import logging
+from reply_message import header_value, reply_subject, new_message_id, build_reply_message
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def decode(resource):
+    return email.message_from_bytes(base64.urlsafe_b64decode(resource["raw"]))
+
+def test_reply_is_threaded_under_the_original():
+    thread = {"thread_id": "t1", "header_message_id": "<b@mail>", "header_references": "<a@mail>"}
+    message_id = new_message_id()
+    resource = build_reply_message("ali@example.com", "Re: Fees", "Thanks", thread, message_id=message_id)
+    assert resource["threadId"] == "t1"
+    message = decode(resource)
+    assert message["To"] == "ali@example.com"
+    assert message["In-Reply-To"] == "<b@mail>"
+    assert message["References"] == "<a@mail> <b@mail>"
+    assert message["Message-ID"] == message_id
+    assert message.get_payload(decode=True).decode() == "Thanks"
+
+def test_reply_without_thread_info_is_a_plain_message():
+    resource = build_reply_message("ali@example.com", "Hello", "Hi")
+    assert "threadId" not in resource
+    message = decode(resource)
+    assert message["In-Reply-To"] is None and message["References"] is None
+
+def test_subject_and_header_helpers():
+    assert reply_subject("Fees") == "Re: Fees"
+    assert reply_subject("RE: Fees") == "RE: Fees"
+    assert reply_subject("") == "Re: No Subject"
+    headers = [{"name": "Message-Id", "value": "<x@mail>"}]
+    assert header_value(headers, "Message-ID") == "<x@mail>"
+    assert header_value(headers, "References") is None
+
+if __name__ == "__main__":
+    test_reply_is_threaded_under_the_original()
+    test_reply_without_thread_info_is_a_plain_message()
+    test_subject_and_header_helpers()
+    logger.info("✅ Reply message tests passed")
@@ -0,0 +1,35 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from reply_pool import generate_replies
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def slow_reply(subject, delay):
+    time.sleep(delay)
+    if subject == "bad":
+        raise ValueError("model error")
+    return f"Re: {subject}"
+
+def test_keeps_order_and_isolates_errors():
+    items = [("a", 0.05), ("bad", 0.01), ("c", 0.0)]
+    assert generate_replies(slow_reply, items) == ["Re: a", None, "Re: c"]
+
+def test_total_time_tracks_slowest_call():
+    items = [(f"s{i}", 0.2) for i in range(8)]
+    started = time.monotonic()
+    results = generate_replies(slow_reply, items, pool=ThreadPoolExecutor(max_workers=8))
+    assert len(results) == 8
+    assert time.monotonic() - started < 0.8
+
+def test_pool_size_bounds_concurrency():
+    started = time.monotonic()
+    generate_replies(slow_reply, [(f"s{i}", 0.1) for i in range(4)], pool=ThreadPoolExecutor(max_workers=2))
+    assert time.monotonic() - started >= 0.2
+
+if __name__ == "__main__":
+    test_keeps_order_and_isolates_errors()
+    test_total_time_tracks_slowest_call()
+    test_pool_size_bounds_concurrency()
+    logger.info("✅ Reply pool tests passed")
@@ -0,0 +1,28 @@
+import logging
+from sanitize import sanitize_text, to_plain_text, make_preview, prepare_body
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_sanitize_keeps_safe_tags_and_escapes_the_rest():
+    assert sanitize_text('<p>Hi <a href="x" onclick="y">there</a><script>z</script></p>') == '<p>Hi <a href="x">there</a>&lt;script&gt;z&lt;/script&gt;</p>'
+    assert sanitize_text(None) == ""
+
+def test_plain_text_strips_markup_and_entities():
+    assert to_plain_text('<div>Fish &amp; chips</div>\n\n\n<p>Tomorrow   at 5</p>') == 'Fish & chips\n\nTomorrow at 5'
+
+def test_preview_is_single_line_and_bounded():
+    assert make_preview('line one\nline two') == 'line one line two'
+    assert make_preview('word ' * 100, length=20) == 'word word word word…'
+
+def test_prepare_body_returns_all_three_forms():
+    body_html, body_text, preview = prepare_body('<p>Hello <b>you</b></p>')
+    assert body_html == '<p>Hello &lt;b&gt;you&lt;/b&gt;</p>'
+    assert body_text == preview == 'Hello you'
+
+if __name__ == "__main__":
+    test_sanitize_keeps_safe_tags_and_escapes_the_rest()
+    test_plain_text_strips_markup_and_entities()
+    test_preview_is_single_line_and_bounded()
+    test_prepare_body_returns_all_three_forms()
+    logger.info("✅ Sanitize tests passed")
@@ -0,0 +1,43 @@
+import logging
+import time
+from send_rate import SendRateLimiter, recipient_domain
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def test_per_minute_budget_and_domain_spacing():
+    limiter = SendRateLimiter(per_minute=3, per_hour=100, per_day=100, domain_spacing=30)
+    assert limiter.reserve("a.com") == 0
+    assert 29 < limiter.reserve("a.com") <= 30  # same domain must wait
+    assert limiter.reserve("b.com") == 0
+    assert limiter.reserve("c.com") == 0
+    assert 59 < limiter.reserve("d.com") <= 60  # minute budget spent
+    snapshot = limiter.snapshot()
+    assert snapshot["minute"] == {"used": 3, "budget": 3}
+    assert snapshot["day"]["used"] == 3
+
+def test_seeded_sends_count_against_the_daily_budget():
+    limiter = SendRateLimiter(per_minute=100, per_hour=100, per_day=2, domain_spacing=0)
+    now = time.time()
+    limiter.seed([now - 2 * 86400, now - 3600, now - 60])  # the first is outside the day window
+    wait = limiter.reserve("a.com")
+    assert 86400 - 3600 - 5 < wait <= 86400 - 3600
+
+def test_projection_follows_the_budgets():
+    limiter = SendRateLimiter(per_minute=2, per_hour=100, per_day=100, domain_spacing=10)
+    now = time.time()
+    # Two sends fit the first minute, the third waits for the minute window, the fourth for a.com's spacing after it
+    finish = limiter.project(["a.com", "b.com", "a.com", "a.com"])
+    assert 70 - 1 < finish - now <= 70 + 1
+    assert limiter.snapshot()["minute"]["used"] == 0  # projecting reserves nothing
+
+def test_recipient_domain():
+    assert recipient_domain("Ali Khan <Ali@Example.COM>") == "example.com"
+    assert recipient_domain("no address") == ""
+
+if __name__ == "__main__":
+    test_per_minute_budget_and_domain_spacing()
+    test_seeded_sends_count_against_the_daily_budget()
+    test_projection_follows_the_budgets()
+    test_recipient_domain()
+    logger.info("✅ Send rate tests passed")